@@ -0,0 +1,68 @@
+"""Chat throughput of one bot process as the number of channels grows.
+
+    python benchmarks/bench_channels.py [lines per channel]
+
+Builds 1 to 200 channels and pushes the same amount of synthetic chat
+into each (default 2,000 lines; ~60% votes, the rest chatter) through
+handle_line(), interleaved. Routing is one dict lookup on the PRIVMSG
+target, so total lines/s should stay flat as channels are added. For comparison, the cost of routing alone by scanning for
+"PRIVMSG #channel" substrings, one channel at a time, is also shown.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+from bench_matcher import make_names
+
+GAMES = [n.title() for n in make_names(300, random.Random(7))]
+CHATTER = ["lol", "PogChamp", "what game is this", "!commands", "gg", "KEKW nice"]
+
+def make_lines(n, names, seed=1):
+    rng, lines = random.Random(seed), []
+    for i in range(n):
+        chan, user = names[i % len(names)], f"viewer{rng.randrange(20000)}"
+        text = f"!vote {rng.choice(GAMES)}" if rng.random() < 0.6 else rng.choice(CHATTER)
+        lines.append(f":{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{chan} :{text}")
+    return lines
+
+def substring_route(lines, targets):
+    hits = 0
+    for line in lines:
+        for t in targets:
+            if f"PRIVMSG {t} " in line:
+                hits += 1
+                break
+    return hits
+
+def main(per_channel):
+    with tempfile.TemporaryDirectory() as tmp:
+        # every title is a known Steam miss, so no lookups leave the process
+        bot.steam_cache = bot.SteamCache(path=os.path.join(tmp, "steam.sqlite3"))
+        for g in GAMES:
+            bot.steam_cache.put(g, None)
+        bot.send_chat = lambda ch, message: None
+        bot.outbox.confirm = lambda channel, user, game: None
+        print(f"{per_channel:,} lines per channel")
+        for count in (1, 10, 50, 100, 200):
+            names = [f"streamer{i}" for i in range(count)]
+            bot.setup_channels(names)
+            n     = per_channel * count
+            lines = make_lines(n, names)
+            t = time.perf_counter()
+            for line in lines:
+                bot.handle_line(line)
+            secs = time.perf_counter() - t
+            votes = sum(ch.leaderboard.total_votes for ch in bot.channels.values())
+            t = time.perf_counter()
+            substring_route(lines, list(bot.channels))
+            scan = time.perf_counter() - t
+            print(f"{count:4} channels: {n:9,} lines, {n / secs:7,.0f} lines/s ({votes:,} votes) | "
+                  f"substring routing alone {n / scan:11,.0f} lines/s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
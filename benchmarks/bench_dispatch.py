@@ -0,0 +1,111 @@
+"""Parse-and-route cost per chat line: old substring/if-chain vs parse_irc + COMMANDS.
+
+    python benchmarks/bench_dispatch.py [recorded.log]
+
+Replays a chat log (one raw IRC line per line, as read off the socket)
+through both routers and reports lines/s. Only routing is timed: which
+handler a line reaches, not what the handler does. Without a log file a
+synthetic one is generated: ~90% chatter, ~10% commands, once plain and
+once with the IRCv3 tags Twitch sends when tags are requested. The
+command lines of the plain log are also timed on their own.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+os.environ.setdefault("BOT_USERNAME", "benchbot")
+import twitch_vote_bot as bot
+
+CHANNEL = "#bench"
+OWNER   = "benchbot"
+CHATTER = ["lol", "PogChamp PogChamp", "what game is this?", "gg", "KEKW that jump",
+           "@streamer try the left path :)", "first time here, hi!", "time: 3:45 left",
+           "LUL", "is this the DLC", "!!", "song?"]
+COMMANDS = ["!vote Hollow Knight", "!vote hades", "!voteremove", "!voteremove last",
+            "!voteremove all", "!confirm", "!archive", "!vote  Celeste ", "!VOTE Outer Wilds"]
+TAGS = ("@badge-info=subscriber/14;badges=subscriber/12,premium/1;client-nonce=5e0f2d1c;"
+        "color=#1E90FF;display-name={nick};emotes={emotes};first-msg=0;flags=;"
+        "id=3b9c0f7a-6d1e-4c55-9a2b-0c8e1f3d2a77;mod=0;returning-chatter=0;room-id=22484632;"
+        "subscriber=1;tmi-sent-ts=1721175300123;turbo=0;user-id={uid};user-type=")
+
+def synthetic_log(n, tagged, seed=1):
+    rng, lines = random.Random(seed), []
+    for i in range(n):
+        uid  = rng.randrange(50000)
+        nick = OWNER if rng.random() < 0.02 else f"viewer{uid}"
+        text = rng.choice(COMMANDS) if rng.random() < 0.1 else rng.choice(CHATTER)
+        line = f":{nick}!{nick}@{nick}.tmi.twitch.tv PRIVMSG {CHANNEL} :{text}"
+        if tagged:
+            emotes = "25:0-4" if rng.random() < 0.3 else ""
+            line = TAGS.format(nick=nick, emotes=emotes, uid=uid) + " " + line
+        lines.append(line)
+    return lines
+
+def legacy_route(line):
+    """The handle_line() routing this replaced, with handlers swapped for labels."""
+    if f"PRIVMSG {CHANNEL}" not in line: return None
+    user = line.split("!",1)[0][1:]; msg = line.split(":",2)[2].strip()
+    if msg.lower()=="!archive" and user.lower()==OWNER.lower(): return "!archive"
+    if msg.lower()=="!confirmarchive" and user.lower()==OWNER.lower(): return "!confirmarchive"
+    if msg.lower().startswith("!archivedelete ") and user.lower()==OWNER.lower(): return "!archivedelete"
+    if msg.lower()=="!confirmdelete" and user.lower()==OWNER.lower(): return "!confirmdelete"
+    if msg.lower()=="!confirmdeleteall" and user.lower()==OWNER.lower(): return "!confirmdeleteall"
+    if msg.lower()=="!voteremove all" and user.lower()==OWNER.lower(): return "!voteremove"
+    if msg.lower()=="!confirm" and user.lower()==OWNER.lower(): return "!confirm"
+    if msg.lower()=="!voteremove last" and user.lower()==OWNER.lower(): return "!voteremove"
+    if msg.lower()=="!voteremove": return "!voteremove own"
+    if msg.lower().startswith("!voteremove ") and user.lower()==OWNER.lower(): return "!voteremove"
+    if msg.lower().startswith("!vote "): return "!vote"
+    return None
+
+LABELS = {bot.cmd_voteremove_own: "!voteremove own"}
+
+def new_route(line):
+    """handle_line() up to the handler call."""
+    if " :!" not in line:
+        return None
+    msg = bot.parse_irc(line)
+    if msg is None or msg.command != "PRIVMSG" or len(msg.params) < 2:
+        return None
+    if bot.channels.get(msg.params[0]) is None:
+        return None
+    text = msg.params[1]
+    if text[:1] != "!":
+        return None
+    name, _, args = text.rstrip().partition(" ")
+    args = args.strip()
+    entry = bot.COMMANDS.get((name.lower(), bool(args)))
+    if entry is None:
+        return None
+    handler, level = entry
+    if level == bot.OWNER and msg.nick.lower() != OWNER:
+        return None
+    return LABELS.get(handler, name.lower())
+
+def run(label, lines):
+    results = {}
+    for name, route in (("legacy", legacy_route), ("parser", new_route)):
+        secs = float("inf")
+        for _ in range(3):                   # best of three: this box is noisy
+            t = time.perf_counter()
+            out = [route(line) for line in lines]
+            secs = min(secs, time.perf_counter() - t)
+        results[name] = out
+        print(f"{label:<10} {name:<7} {len(lines) / secs:12,.0f} lines/s "
+              f"({sum(r is not None for r in out):,} routed to a handler)")
+    diff = sum(a != b for a, b in zip(results["legacy"], results["parser"]))
+    print(f"{label:<10} routed differently: {diff:,} of {len(lines):,}")
+
+if __name__ == "__main__":
+    bot.setup_channels(["bench"])
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8", errors="ignore") as f:
+            run("recorded", [l.rstrip("\r\n") for l in f if l.strip()])
+    else:
+        plain = synthetic_log(500_000, tagged=False)
+        run("plain", plain)
+        run("commands", [l for l in plain if " :!" in l])
+        run("tagged", synthetic_log(500_000, tagged=True))
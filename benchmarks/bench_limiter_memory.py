@@ -0,0 +1,71 @@
+"""Memory used by per-user vote limits for a large audience.
+
+    python benchmarks/bench_limiter_memory.py [chatters]
+
+Simulates a week with 100k unique chatters (by default). Each day, half
+of them cast a vote and the other half only trip the daily-limit check
+(for example with a malformed !vote). Peak traced memory is compared
+between the old nested defaultdicts and VoteLimiter.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+
+DAYS = [f"2025-07-{d:02d}" for d in range(13, 20)]
+WEEK = "2025-W28"
+
+def users(n):
+    # fresh strings, as parsed off the socket
+    return ["".join(("viewer_", str(i))) for i in range(n)]
+
+def run_legacy(names):
+    user_votes        = defaultdict(dict)
+    user_daily_counts = defaultdict(lambda: defaultdict(int))
+    for d, day in enumerate(DAYS):
+        for i, user in enumerate(names):
+            if user_daily_counts[user][day] >= 5:
+                continue
+            if (i + d) % 2:
+                continue                     # read-only: limit check, no vote
+            key = f"game {(i + d) % 500}"
+            if user_votes[user].get(key) != WEEK:
+                user_votes[user][key] = WEEK; user_daily_counts[user][day] += 1
+    return user_votes, user_daily_counts
+
+def run_limiter(names):
+    limiter = bot.VoteLimiter()
+    for d, day in enumerate(DAYS):
+        for i, user in enumerate(names):
+            if limiter.votes_today(user, day) >= 5:
+                continue
+            if (i + d) % 2:
+                continue
+            key = f"game {(i + d) % 500}"
+            if not limiter.has_voted(user, key, WEEK):
+                limiter.count(user, key, day, WEEK)
+    return limiter
+
+def measure(fn, n):
+    names = users(n)
+    tracemalloc.start()
+    t = time.perf_counter()
+    state = fn(names)
+    secs = time.perf_counter() - t
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+    return current, peak, secs
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{n:,} chatters over {len(DAYS)} days")
+    for label, fn in (("nested defaultdicts", run_legacy), ("VoteLimiter", run_limiter)):
+        current, peak, secs = measure(fn, n)
+        print(f"{label:<20} retained {current / 1e6:7.1f} MB | peak {peak / 1e6:7.1f} MB"
+              f" | {current / n:6.0f} B/chatter | {secs:5.2f}s")
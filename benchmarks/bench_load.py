@@ -0,0 +1,256 @@
+"""Load test: the whole bot against a local fake Twitch, under a synthetic raid.
+
+    python benchmarks/bench_load.py [--chatters 2000] [--rate 50] [--duration 20] ...
+
+Starts a fake IRC server and a stub HTTP server (Steam search and the
+Twitch emote API) on 127.0.0.1, then runs the bot's main() in a child
+process pointed at them from an empty temp directory. Once the bot
+JOINs, the raid starts: --rate chat lines a second for --duration
+seconds from --chatters viewers. Most lines are !vote for titles from a
+fixed pool, often misspelled, and the rest are ordinary chatter.
+
+Reported:
+  messages/s   lines the bot's dispatch loop got through, per second
+               (equal to --rate while it keeps up; raise --rate to find
+               where it stops)
+  reply p50/p99  time from a !vote being sent to the reply naming that
+               viewer (a merged "✅ counted: …" line counts for each name)
+  publishes    page renders/pushes (git fails harmlessly: not a repo)
+  peak RSS     of the bot process
+
+Replies are rate limited like on Twitch, so latency under a heavy raid
+is mostly the chat allowance; BOT_IS_MOD defaults to 1 (100 lines/30s)
+here. --json prints the results as one JSON object, to keep and compare
+between runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from bench_matcher import make_names, misspell
+
+CHATTER = ["lol", "PogChamp", "what game is this", "gg", "KEKW nice", "hi chat", "!commands"]
+
+# the bot, run in a child process; counts what its dispatch loop handles
+DRIVER = r"""
+import asyncio, json, resource, sys, time
+sys.path.insert(0, ROOT)
+import twitch_vote_bot as bot
+
+handled = {"lines": 0, "first": 0.0, "last": 0.0}
+handle_line = bot.handle_line
+
+def counting(line):
+    handle_line(line)
+    if " PRIVMSG " not in line:
+        return                               # PONGs to the bot's keepalive
+    now = time.time()
+    if not handled["lines"]:
+        handled["first"] = now
+    handled["lines"] += 1
+    handled["last"] = now
+
+bot.handle_line = counting
+asyncio.run(bot.main())
+print("RESULT " + json.dumps(dict(
+    handled,
+    publishes=sum(ch.publisher.publish_count for ch in bot.channels.values()),
+    sent=bot.outbox.sent, merged=bot.outbox.merged, dropped=bot.outbox.dropped,
+    peak_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)), flush=True)
+"""
+
+class StubHTTP(BaseHTTPRequestHandler):
+    """Steam search (a hit for any title in the pool) and the global emote list."""
+    titles = {}                              # lowercase title -> title
+    delay  = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        time.sleep(self.delay)
+        if url.path.endswith("/chat/emotes/global"):
+            body = json.dumps({"data": [{"images": {"url_4x": f"http://{self.headers['Host']}/emote.png"}}]})
+            ctype = "application/json"
+        else:
+            term  = parse_qs(url.query).get("term", [""])[0]
+            title = self.titles.get(term.lower())
+            row   = (f"<a class='search_result_row' href='https://store.example/app/{abs(hash(title))}/?snr=1'>"
+                     f"<span class='title'>{escape(title)}</span></a>") if title else ""
+            body, ctype = f"<html><body>{row}</body></html>", "text/html"
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class FakeTwitch:
+    """Just enough of Twitch IRC: take the login and JOINs, answer PINGs,
+    play the raid, and timestamp every reply the bot sends."""
+    def __init__(self, args, titles):
+        self.args      = args
+        self.titles    = titles
+        self.rng       = random.Random(args.seed)
+        self.joined    = asyncio.Event()
+        self.channels  = []
+        self.pending   = {}                  # viewer -> [send times of unanswered votes]
+        self.latencies = []
+        self.sent      = 0
+        self.votes     = 0
+        self.replies   = 0
+
+    async def handle(self, reader, writer):
+        self.writer = writer
+        asyncio.create_task(self.play())
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+            if line.startswith("PING"):
+                writer.write(f"PONG {line[5:]}\r\n".encode())
+            elif line.startswith("JOIN "):
+                self.channels += line[5:].split(",")
+                if len(self.channels) >= self.args.channels:
+                    self.joined.set()
+            elif line.startswith("PRIVMSG "):
+                self.on_reply(line.split(" :", 1)[1], time.perf_counter())
+
+    def on_reply(self, text, now):
+        self.replies += 1
+        if text.startswith("✅ counted: "):
+            users = [part.split("→", 1)[0] for part in text[len("✅ counted: "):].split(", ")]
+        elif text.startswith("@"):
+            users = [text[1:].split(" ", 1)[0]]
+        else:
+            return
+        for user in users:
+            times = self.pending.get(user)
+            if times:
+                self.latencies.append(now - times.pop(0))
+
+    def make_line(self):
+        rng  = self.rng
+        user = f"viewer{rng.randrange(self.args.chatters)}"
+        chan = rng.choice(self.channels)
+        if rng.random() < self.args.votes:
+            title = rng.choice(self.titles)
+            if rng.random() < self.args.typos:
+                title = misspell(title, rng)
+            return user, f":{user}!{user}@{user}.tmi.twitch.tv PRIVMSG {chan} :!vote {title}\r\n"
+        return None, f":{user}!{user}@{user}.tmi.twitch.tv PRIVMSG {chan} :{rng.choice(CHATTER)}\r\n"
+
+    async def play(self):
+        await self.joined.wait()
+        tick, start = 0.01, time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < self.args.duration:
+            batch = []
+            while self.sent < elapsed * self.args.rate:
+                user, line = self.make_line()
+                batch.append(line.encode())
+                self.sent += 1
+                if user:
+                    self.votes += 1
+                    self.pending.setdefault(user, []).append(time.perf_counter())
+            self.writer.writelines(batch)
+            await self.writer.drain()
+            await asyncio.sleep(tick)
+        # let the outbox drain, then hang up so the bot shuts down
+        quiet = time.perf_counter()
+        while any(self.pending.values()) and time.perf_counter() - quiet < self.args.drain:
+            n = len(self.latencies)
+            await asyncio.sleep(0.5)
+            if len(self.latencies) != n:
+                quiet = time.perf_counter()
+        self.writer.close()
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else float("nan")
+
+async def run(args):
+    titles = [n.title() for n in make_names(args.games, random.Random(args.seed))]
+    StubHTTP.titles = {t.lower(): t for t in titles}
+    StubHTTP.delay  = args.steam_delay
+    http = ThreadingHTTPServer(("127.0.0.1", 0), StubHTTP)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    web = f"http://127.0.0.1:{http.server_port}"
+
+    fake   = FakeTwitch(args, titles)
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+    port   = server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   CHANNEL_NAME=",".join(f"loadtest{i}" for i in range(args.channels)),
+                   BOT_USERNAME="loadbot", OAUTH_TOKEN="oauth:loadtest", CLIENT_ID="loadtest",
+                   IRC_HOST="127.0.0.1", IRC_PORT=str(port),
+                   STEAM_SEARCH_URL=web + "/search/", TWITCH_API_URL=web + "/helix/",
+                   PUBLISH_INTERVAL=str(args.publish_interval),
+                   BOT_IS_MOD=os.environ.get("BOT_IS_MOD", "1"), HTTP_PORT="0")
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", f"ROOT = {ROOT!r}\n" + DRIVER, cwd=tmp, env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        out, _ = await proc.communicate()
+    server.close()
+    http.shutdown()
+
+    result = next((json.loads(line[7:]) for line in out.decode().splitlines() if line.startswith("RESULT ")), None)
+    if result is None:
+        sys.exit("bot exited without reporting:\n" + out.decode())
+    span = max(result["last"] - result["first"], 1e-9)
+    return {
+        "lines_sent":   fake.sent,
+        "votes_sent":   fake.votes,
+        "messages_s":   round(result["lines"] / span, 1),
+        "reply_p50_ms": round(percentile(fake.latencies, 50) * 1e3, 1),
+        "reply_p99_ms": round(percentile(fake.latencies, 99) * 1e3, 1),
+        "answered":     len(fake.latencies),
+        "reply_lines":  fake.replies,
+        "merged":       result["merged"],
+        "dropped":      result["dropped"],
+        "publishes":    result["publishes"],
+        "peak_rss_mb":  round(result["peak_rss_kb"] / 1024, 1),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--chatters", type=int, default=2000, help="distinct viewers in the raid")
+    ap.add_argument("--rate", type=float, default=50, help="chat lines per second")
+    ap.add_argument("--duration", type=float, default=20, help="seconds of raid")
+    ap.add_argument("--channels", type=int, default=1)
+    ap.add_argument("--games", type=int, default=300, help="titles in the pool")
+    ap.add_argument("--votes", type=float, default=0.6, help="share of lines that are !vote")
+    ap.add_argument("--typos", type=float, default=0.5, help="share of votes misspelled")
+    ap.add_argument("--steam-delay", type=float, default=0.05, help="stub Steam response time, s")
+    ap.add_argument("--publish-interval", type=float, default=2)
+    ap.add_argument("--drain", type=float, default=30, help="after the raid, hang up once no reply has come for this long")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    r = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(r))
+        return
+    print(f"{r['lines_sent']} lines ({r['votes_sent']} votes) | {r['messages_s']:.0f} messages/s"
+          f" | reply p50 {r['reply_p50_ms']:.0f} ms p99 {r['reply_p99_ms']:.0f} ms"
+          f" ({r['answered']} answered in {r['reply_lines']} lines, {r['dropped']} dropped)"
+          f" | {r['publishes']} publishes | peak RSS {r['peak_rss_mb']} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare GameMatcher with the old difflib.get_close_matches scan.
+
+    python benchmarks/bench_matcher.py
+
+For 100, 1k and 10k suggestion keys it times both lookups over the same
+mix of exact, misspelled and unknown queries, and checks they agree.
+"""
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+
+SYLLABLES = ("ka ri to na me shi lo ven dar mor eth al ion ur bel tha gor fen quin "
+             "zar pel mi dra cor vy an est ok lum sar wyn hel ix bro tel gri nos").split()
+FILLER    = ["the", "of", "and", "2", "3", "ii", "iv", "online", "remastered", "edition"]
+
+def make_vocabulary(rng, size=3000):
+    # Steam titles come from a large vocabulary; a handful of common words
+    # would make every title share most bigrams with every other
+    vocab = set()
+    while len(vocab) < size:
+        vocab.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(vocab)
+
+def make_names(n, rng):
+    vocab = make_vocabulary(rng)
+    names = set()
+    while len(names) < n:
+        words = rng.sample(vocab, rng.randint(1, 3))
+        if rng.random() < 0.4:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(FILLER))
+        names.add(" ".join(words))
+    return sorted(names)
+
+def misspell(name, rng):
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.33:
+            chars.pop(i)
+        elif op < 0.66:
+            chars.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars) or name
+
+def make_queries(names, count, rng):
+    queries = []
+    for _ in range(count):
+        r = rng.random()
+        if r < 0.3:
+            queries.append(rng.choice(names))
+        elif r < 0.8:
+            queries.append(misspell(rng.choice(names), rng))
+        else:
+            queries.append(misspell(rng.choice(names), rng) + " " + rng.choice(SYLLABLES) * 3)
+    return queries
+
+def bench(n, queries_per_size=200, seed=1):
+    rng     = random.Random(seed)
+    names   = make_names(n, rng)
+    queries = make_queries(names, queries_per_size, rng)
+    m = bot.GameMatcher()
+    for key in names:
+        m.add(key)
+
+    t = time.perf_counter()
+    old = [(difflib.get_close_matches(q.lower(), names, n=1, cutoff=0.7) or [None])[0] for q in queries]
+    t_old = time.perf_counter() - t
+
+    t = time.perf_counter()
+    new = [m._fuzzy(q.lower()) for q in queries]
+    t_new = time.perf_counter() - t
+
+    agree = sum(a == b for a, b in zip(old, new))
+    per = 1e3 / len(queries)
+    print(f"{n:>6} names | difflib {t_old*per:8.3f} ms/query | matcher {t_new*per:8.3f} ms/query"
+          f" | x{t_old / t_new:5.1f} | agree {agree}/{len(queries)}")
+    return agree == len(queries)
+
+if __name__ == "__main__":
+    ok = all([bench(100), bench(1000), bench(10000)])
+    sys.exit(0 if ok else 1)
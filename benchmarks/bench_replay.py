@@ -0,0 +1,95 @@
+"""Time startup replay of a large vote log.
+
+    python benchmarks/bench_replay.py [events] [budget, s]
+
+Writes a synthetic week of votes (default 1,000,000 events, ~2% removals
+and Steam renames) into a temporary state directory, then rebuilds the
+vote state from it with VoteLog.replay(). The state is replayed twice:
+from the raw log, and again from a snapshot plus the longest tail the
+bot lets build up after one (WAL_SNAPSHOT_RATIO of the votes held, or
+WAL_SNAPSHOT_EVERY events), which must give the same state.
+
+Snapshot plus tail is the worst a restart reads, and has to fit in the
+budget (default 3 s), or the script exits non-zero. A log is only
+replayed whole if it predates snapshots: the one a snapshot covers is
+deleted once it is written, and each week starts with a snapshot of the
+empty state. That time is reported, not held to the budget.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+
+def write_log(path, events, games=2000, users=100000, seed=1):
+    rng   = random.Random(seed)
+    voted = []
+    with open(path, "w", encoding="utf-8") as f:
+        for seq in range(1, events + 1):
+            r = rng.random()
+            if r < 0.01 and voted:
+                key, user = voted.pop()
+                ev = {"op": "unvote", "key": key, "user": user, "forget": True}
+            elif r < 0.02:
+                g = rng.randrange(games)
+                ev = {"op": "rename", "key": f"game {g}", "to": f"game {g}", "name": f"Game {g}",
+                      "url": f"https://store.steampowered.com/app/{g}/"}
+            else:
+                key, user = f"game {rng.randrange(games)}", f"user{rng.randrange(users)}"
+                ev = {"op": "vote", "key": key, "name": key.title(), "url": None, "user": user,
+                      "time": "08:15 PM, Jul 16", "week": "2025-W28", "day": "2025-07-16"}
+                voted.append((key, user))
+            ev["seq"] = seq
+            f.write(json.dumps(bot.log_row(ev), separators=(",", ":")) + "\n")
+
+def state(ch):
+    board = [(e.key, e.name, e.url, e.user, e.time, e.votes) for e in ch.leaderboard]
+    return ch.leaderboard.total_votes, board, ch.history.dump(), ch.limiter.dump()
+
+def timed_replay(log):
+    t = time.perf_counter()
+    count = log.replay()
+    return count, time.perf_counter() - t
+
+def main(events, budget):
+    with tempfile.TemporaryDirectory() as tmp:
+        ch  = bot.Channel("bench", tmp, tmp)
+        log = ch.vote_log
+        t = time.perf_counter()
+        write_log(log.path, events)
+        print(f"wrote {events:,} events ({os.path.getsize(log.path) / 1e6:.0f} MB) "
+              f"in {time.perf_counter() - t:.1f}s")
+
+        count, secs = timed_replay(log)
+        print(f"log replay:      {count:,} events in {secs:.2f}s "
+              f"({count / secs:,.0f} events/s) -> {len(ch.leaderboard)} games, "
+              f"{ch.leaderboard.total_votes:,} votes, {len(ch.history):,} history")
+        expected = state(ch)
+
+        # snapshot everything but the tail, the way a running bot would
+        with open(log.path, encoding="utf-8") as f:
+            lines = f.readlines()
+        cut = len(lines) - int(max(bot.WAL_SNAPSHOT_EVERY, len(ch.history) * bot.WAL_SNAPSHOT_RATIO))
+        with open(log.path, "w", encoding="utf-8") as f:
+            f.writelines(lines[:cut])
+        log.replay()
+        with open(log.snapshot_path, "w", encoding="utf-8") as f:
+            json.dump(bot.dump_state(bot.capture_state(ch, cut)), f, separators=(",", ":"))
+        with open(log.path, "w", encoding="utf-8") as f:
+            f.writelines(lines[cut:])
+        total = ch.leaderboard.total_votes
+        count, secs = timed_replay(log)
+        print(f"snapshot+tail:   {count:,} tail events in {secs:.2f}s -> "
+              f"{ch.leaderboard.total_votes:,} votes (was {total:,} at snapshot)")
+        assert state(ch) == expected, "snapshot+tail state differs from the raw log replay"
+        if secs > budget:
+            sys.exit(f"snapshot+tail replay took {secs:.2f}s, over the {budget:.1f}s budget")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 3.0)
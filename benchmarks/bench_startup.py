@@ -0,0 +1,103 @@
+"""How long the bot takes to start, with a slow Twitch API.
+
+    python benchmarks/bench_startup.py [api delay, s]
+
+Points the emote API at a stub that takes `api delay` seconds to answer
+(default 2) and the IRC connection at a local server that hangs up on
+the first JOIN. Then, over 5 fresh processes each, it times:
+
+  import        `import twitch_vote_bot`, and whether requests/bs4 got loaded
+  to JOIN       process start to the bot's JOIN, with and without an
+                emote list already cached in state/emotes.json
+
+The emote fetch, the heavy imports and the stats load run in the
+background once the bot is connected, so neither number should include
+the API delay. They used to: the emote list was fetched at import time.
+"""
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from bench_load import StubHTTP
+
+RUNS = 5
+
+IMPORT = f"""
+import sys, time, json
+t = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+import twitch_vote_bot
+print(json.dumps([time.perf_counter() - t, "requests" in sys.modules, "bs4" in sys.modules]))
+"""
+
+RUN = f"""
+import sys, asyncio
+sys.path.insert(0, {ROOT!r})
+import twitch_vote_bot
+asyncio.run(twitch_vote_bot.main())
+"""
+
+async def time_to_join(env, cwd):
+    joined = asyncio.get_running_loop().create_future()
+
+    async def handle(reader, writer):
+        while not joined.done():
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"JOIN "):
+                joined.set_result(time.perf_counter())
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    env    = dict(env, IRC_PORT=str(server.sockets[0].getsockname()[1]))
+    start  = time.perf_counter()
+    proc   = await asyncio.create_subprocess_exec(sys.executable, "-c", RUN, cwd=cwd, env=env,
+                                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    at = await asyncio.wait_for(joined, 30)
+    await proc.wait()
+    server.close()
+    return at - start
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    StubHTTP.delay = delay
+    http = ThreadingHTTPServer(("127.0.0.1", 0), StubHTTP)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    env = dict(os.environ, CHANNEL_NAME="bench", BOT_USERNAME="bench", OAUTH_TOKEN="oauth:bench",
+               CLIENT_ID="bench", IRC_HOST="127.0.0.1", HTTP_PORT="0",
+               TWITCH_API_URL=f"http://127.0.0.1:{http.server_port}/helix/")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [json.loads(subprocess.run([sys.executable, "-c", IMPORT], cwd=tmp, env=env,
+                                          capture_output=True, text=True, check=True).stdout)
+                for _ in range(RUNS)]
+        t = statistics.median(r[0] for r in runs)
+        print(f"API delay {delay:.1f} s | import {t*1e3:6.1f} ms"
+              f" | requests loaded: {runs[0][1]} | bs4 loaded: {runs[0][2]}")
+
+        for label, cached in (("no emote cache", False), ("emote cache", True)):
+            times = []
+            for _ in range(RUNS):
+                shutil.rmtree(os.path.join(tmp, "state"), ignore_errors=True)
+                if cached:
+                    os.makedirs(os.path.join(tmp, "state"))
+                    with open(os.path.join(tmp, "state", "emotes.json"), "w") as f:
+                        json.dump({"fetched": time.time(), "urls": ["http://example/e.png"]}, f)
+                times.append(asyncio.run(time_to_join(env, tmp)))
+            print(f"{'':>17}| to JOIN, {label:<14} {statistics.median(times)*1e3:6.1f} ms")
+    http.shutdown()
+
+if __name__ == "__main__":
+    main()
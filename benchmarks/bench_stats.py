@@ -0,0 +1,65 @@
+"""Cost of the cross-week stats as the archive grows.
+
+    python benchmarks/bench_stats.py
+
+Writes 1, 5 and 10 years of synthetic weekly archives (80 games and 300
+voters a week, from a pool of 1,500 titles) into a temp directory, then
+times loading them into VoteStats, archiving one more week, and the
+!top, !stats and !history lookups. The lookups read precomputed rollups
+and should stay well under a millisecond at every size.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+from bench_matcher import make_names
+
+TITLES = [n.title() for n in make_names(1500, random.Random(3))]
+
+def make_week(rng, week_id):
+    games = [{"key": t.lower(), "name": t, "votes": rng.randint(1, 40), "url": None,
+              "user": f"viewer{rng.randrange(5000)}", "time": ""} for t in rng.sample(TITLES, 80)]
+    games.sort(key=lambda g: -g["votes"])
+    voters = {f"viewer{rng.randrange(5000)}": rng.randint(1, 5) for _ in range(300)}
+    entry  = {"week_id": week_id, "start": "", "end": "", "file": None,
+              "total_votes": sum(g["votes"] for g in games)}
+    return entry, games, voters
+
+def timeit(fn, n):
+    t = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t) / n * 1e6
+
+def bench(years, tmp):
+    rng   = random.Random(years)
+    store = bot.ArchiveStore(os.path.join(tmp, "archives"), os.path.join(tmp, "archives", "archives.json"))
+    weeks = [f"{2000 + y}-W{w:02d}" for y in range(years) for w in range(52)]
+    for w in weeks[:-1]:
+        store.add(*make_week(rng, w))
+    stats = bot.VoteStats(store)
+    t = time.perf_counter()
+    stats.load()
+    t_load = time.perf_counter() - t
+
+    store.add(*make_week(rng, weeks[-1]))
+    t = time.perf_counter()
+    stats.add_week(weeks[-1])
+    t_add = time.perf_counter() - t
+
+    queries = [rng.choice(TITLES).lower() for _ in range(200)]
+    t_top   = timeit(stats.top, 1000)
+    t_stats = timeit(lambda: (stats.summary(), stats.top_voters()), 1000)
+    t_hist  = timeit(lambda: [stats.history(q) for q in queries], 5) / len(queries)
+    print(f"{len(weeks):>4} weeks | load {t_load*1e3:7.1f} ms | add week {t_add*1e3:6.1f} ms"
+          f" | !top {t_top:5.2f} us | !stats {t_stats:5.2f} us | !history {t_hist:6.1f} us")
+
+if __name__ == "__main__":
+    for years in (1, 5, 10):
+        with tempfile.TemporaryDirectory() as tmp:
+            bench(years, tmp)
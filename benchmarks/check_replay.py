@@ -0,0 +1,106 @@
+"""Check that log replay rebuilds the state apply_event() builds.
+
+    python benchmarks/check_replay.py [logs]
+
+Not a timing run: the script exits non-zero on the first log that fails.
+VoteLog.replay() takes votes in bulk (BulkReplay) rather than one event
+at a time, so each of a few hundred random logs (default 300) is checked
+against the same events applied one by one with apply_event():
+
+  raw log        the whole log, no snapshot
+  snapshot+tail  a snapshot at a random point, the events after it split
+                 between votes.log.prev and votes.log, with a few events
+                 the snapshot covers repeated at the head of prev
+
+The logs are small, with few chatters and games so that the cases meet:
+votes over several days and weeks, removals (from the limiter or not),
+renames and merges, store-link fills, clears and weekly archives.
+Channels are written to a temp directory.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+
+USERS = [f"user{i}" for i in range(15)]
+GAMES = [f"game {i}" for i in range(12)]
+
+def state(ch):
+    board = [(e.key, e.name, e.url, e.user, e.time, e.votes) for e in ch.leaderboard]
+    return ch.leaderboard.total_votes, board, ch.history.dump(), ch.limiter.dump()
+
+def make_events(rng, n, tmp):
+    """n events, made by driving a channel so that every unvote is one the
+    bot could have logged."""
+    ch, events, day, minute = bot.Channel("gen", tmp, tmp), [], 0, 0
+    for seq in range(1, n + 1):
+        day    += rng.random() < 0.02
+        minute += rng.random() < 0.2
+        r, ev = rng.random(), None
+        if r < 0.05:
+            last = ch.history.last_by(rng.choice(USERS)) if rng.random() < 0.7 else ch.history.last()
+            if last:
+                ev = {"op": "unvote", "key": last.key, "user": last.user, "forget": rng.random() < 0.8}
+        elif r < 0.09:
+            key = rng.choice(GAMES)
+            to  = rng.choice(GAMES) if rng.random() < 0.5 else key
+            ev  = {"op": "rename", "key": key, "to": to, "name": to.title(), "url": f"https://store/{to}"}
+        elif r < 0.095:
+            ev = {"op": "url", "key": rng.choice(GAMES), "name": "Filled", "url": "https://store/filled"}
+        elif r < 0.098:
+            ev = {"op": "clear"}
+        elif r < 0.1:
+            ev = {"op": "archive", "week": f"2025-W{10 + day // 7:02d}"}
+        if ev is None:
+            key = rng.choice(GAMES)
+            ev  = {"op": "vote", "key": key, "name": key.title(), "url": None, "user": rng.choice(USERS),
+                   "time": f"minute {minute}", "week": f"2025-W{10 + day // 7:02d}", "day": f"day {day}"}
+        ev["seq"] = seq
+        events.append(ev)
+        bot.apply_event(ch, dict(ev))
+    return events
+
+def one_by_one(events, tmp):
+    ch = bot.Channel("ref", tmp, tmp)
+    for ev in events:
+        bot.apply_event(ch, dict(ev))
+    return ch
+
+def write_log(path, events):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(bot.log_row(ev)) + "\n" for ev in events)
+
+def check(seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        events = make_events(rng, rng.randrange(1, 600), os.path.join(tmp, "gen"))
+        want   = state(one_by_one(events, os.path.join(tmp, "ref")))
+        ch     = bot.Channel("check", tmp, tmp)
+        log    = ch.vote_log
+
+        write_log(log.path, events)
+        log.replay()
+        assert state(ch) == want, f"log {seed}: raw log replay differs"
+
+        cut = rng.randrange(len(events) + 1)
+        ref = one_by_one(events[:cut], os.path.join(tmp, "cut"))
+        with open(log.snapshot_path, "w", encoding="utf-8") as f:
+            json.dump(bot.dump_state(bot.capture_state(ref, cut)), f)
+        split = rng.randrange(cut, len(events) + 1)
+        write_log(log.prev_path, events[max(0, cut - 5):split])
+        write_log(log.path, events[split:])
+        log.replay()
+        assert state(ch) == want, f"log {seed}: snapshot at {cut} + tail replay differs"
+
+def main(logs):
+    for seed in range(logs):
+        check(seed)
+    print(f"ok  {logs} random logs replay to the state apply_event() builds")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
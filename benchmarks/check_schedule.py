@@ -0,0 +1,135 @@
+"""Check the weekly archive schedule across DST changes and downtime.
+
+    python benchmarks/check_schedule.py
+
+Not a timing run: every case is an assert, and the script exits non-zero
+on the first one that fails. It covers:
+
+  next_weekly    Saturday 00:00 Pacific on both sides of the 2026 DST
+                 changes (Mar 8 and Nov 1), from times inside the week,
+                 on the deadline itself, and in the repeated 01:00 hour
+  start()        first run, a restart after a missed deadline (catches
+                 up once, labelled with the missed week), and a restart
+                 with nothing due
+  run()          a fake clock and sleep driven through October and
+                 November, which must archive every Saturday at 00:00
+
+Channels are written to a temp directory, and git publishing is
+stubbed out, so nothing touches the working tree.
+"""
+import asyncio
+import datetime
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CHANNEL_NAME", "bench")
+import twitch_vote_bot as bot
+
+PST = bot.PST
+
+def local(*args):
+    return PST.localize(datetime.datetime(*args))
+
+def check(label, got, want):
+    assert got == want and got.utcoffset() == want.utcoffset(), f"{label}: got {got}, want {want}"
+    print(f"ok  {label:<44} {got.isoformat()}")
+
+def check_next_weekly():
+    cases = [
+        ("mid-week before spring forward",    local(2026, 3, 4, 12),      local(2026, 3, 7)),
+        ("on the deadline before it",         local(2026, 3, 7),          local(2026, 3, 14)),
+        ("just after spring forward",         local(2026, 3, 8, 3),       local(2026, 3, 14)),
+        ("on the deadline before fall back",  local(2026, 10, 31),        local(2026, 11, 7)),
+        ("half an hour past it",              local(2026, 10, 31, 0, 30), local(2026, 11, 7)),
+        ("in the repeated 01:00 hour (PDT)",  PST.localize(datetime.datetime(2026, 11, 1, 1, 30), is_dst=True),
+                                                                          local(2026, 11, 7)),
+        ("in the repeated 01:00 hour (PST)",  PST.localize(datetime.datetime(2026, 11, 1, 1, 30), is_dst=False),
+                                                                          local(2026, 11, 7)),
+        ("given in UTC",                      datetime.datetime(2026, 11, 7, 7, 59, tzinfo=datetime.timezone.utc),
+                                                                          local(2026, 11, 7)),
+    ]
+    for label, after, want in cases:
+        check(label, bot.next_weekly(after), want)
+
+    # a year of deadlines: always Saturday 00:00 local, 7 days apart on the
+    # calendar, which is 167 h across spring forward and 169 h across fall back
+    at, gaps = bot.next_weekly(local(2026, 1, 1)), {}
+    for _ in range(52):
+        nxt = bot.next_weekly(at)
+        assert (nxt.weekday(), nxt.hour, nxt.minute) == (5, 0, 0), nxt
+        hours = (nxt - at).total_seconds() / 3600
+        gaps[hours] = gaps.get(hours, 0) + 1
+        at = nxt
+    assert gaps == {167: 1, 168: 50, 169: 1}, gaps
+    print(f"ok  {'52 weeks of 2026 (gap in hours: count)':<44} {gaps}")
+
+def vote(ch, user, name):
+    bot.record(ch, {"op": "vote", "key": name.lower(), "name": name, "url": None, "user": user,
+                    "time": "", "week": "", "day": ""})
+
+def check_start(tmp):
+    ch = bot.Channel("check", os.path.join(tmp, "out"), os.path.join(tmp, "state"))
+    ch.open()
+
+    bot.ArchiveScheduler(clock=lambda: local(2026, 10, 14, 12)).start([ch])
+    check("first run on Wed Oct 14", ch.next_archive, local(2026, 10, 17))
+    with open(ch.schedule_file, encoding="utf-8") as f:
+        assert json.load(f) == {"next_archive": "2026-10-17T00:00:00-07:00"}
+    assert not ch.archives.weeks()
+
+    # down from Wednesday until the Tuesday after the deadline
+    vote(ch, "alice", "Celeste")
+    vote(ch, "bob", "Celeste")
+    ch.next_archive = None
+    bot.ArchiveScheduler(clock=lambda: local(2026, 10, 20, 9)).start([ch])
+    assert list(ch.archives.weeks()) == ["2026-W41"], ch.archives.weeks()
+    assert ch.archives.results("2026-W41")[0]["total_votes"] == 2
+    assert not len(ch.leaderboard)
+    check("restart on Tue Oct 20 archives 2026-W41", ch.next_archive, local(2026, 10, 24))
+
+    bot.ArchiveScheduler(clock=lambda: local(2026, 10, 21, 9)).start([ch])
+    assert list(ch.archives.weeks()) == ["2026-W41"], ch.archives.weeks()
+    check("restart on Wed Oct 21 with nothing due", ch.next_archive, local(2026, 10, 24))
+    return ch
+
+class FakeTime:
+    """A clock that only moves when the scheduler sleeps."""
+    def __init__(self, now, until):
+        self.now, self.until = now, until
+
+    def clock(self):
+        return self.now
+
+    async def sleep(self, secs):
+        assert 0 <= secs <= bot.SCHEDULE_MAX_SLEEP, secs
+        self.now = (self.now + datetime.timedelta(seconds=secs)).astimezone(PST)
+        if self.now >= self.until:
+            raise asyncio.CancelledError
+
+def check_run(ch):
+    archived = []
+    run_archive = bot.run_archive
+    bot.run_archive = lambda ch, now: (archived.append(now), run_archive(ch, now))
+    fake = FakeTime(local(2026, 10, 21, 9), local(2026, 11, 20))
+    try:
+        asyncio.run(bot.ArchiveScheduler(clock=fake.clock, sleep=fake.sleep).run([ch]))
+    except asyncio.CancelledError:
+        pass
+    finally:
+        bot.run_archive = run_archive
+    want = [local(2026, 10, 24), local(2026, 10, 31), local(2026, 11, 7), local(2026, 11, 14)]
+    assert archived == want and [a.utcoffset() for a in archived] == [w.utcoffset() for w in want], archived
+    print(f"ok  {'run() from Oct 21 to Nov 20':<44} {', '.join(a.isoformat() for a in archived)}")
+    check("next deadline after that", ch.next_archive, local(2026, 11, 21))
+
+def main():
+    bot.push_to_github = lambda ch: None
+    check_next_weekly()
+    with tempfile.TemporaryDirectory() as tmp:
+        check_run(check_start(tmp))
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,148 @@
-import socket
+import asyncio
+import bisect
 import datetime
+import functools
+import gc
 import pytz
 import os
 import json
-import requests
+import hashlib
+import heapq
+import itertools
+import operator
+import importlib
 import subprocess
+import sqlite3
 import random
 import time
 import sys
+import threading
 from dotenv import load_dotenv
 load_dotenv()
-from collections import defaultdict
-from urllib.parse import quote_plus
+from array import array
+from collections import Counter, defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, unquote
+from html import escape as html_escape
 import difflib
-from bs4 import BeautifulSoup
 
 # ====== CONFIG ======
 CLIENT_ID    = os.getenv("CLIENT_ID")
 OAUTH_TOKEN  = os.getenv("OAUTH_TOKEN")
 BOT_USERNAME = os.getenv("BOT_USERNAME")
-CHANNEL_NAME = os.getenv("CHANNEL_NAME")
-CHANNEL      = "#" + CHANNEL_NAME.lower()
+CHANNEL_NAME = os.getenv("CHANNEL_NAME")         # one channel, or several comma-separated
+CHANNEL_NAMES = [c.strip().lstrip("#").lower() for c in CHANNEL_NAME.split(",") if c.strip()]
 VOTE_FILE         = "index.html"
 VOTES_JSON        = "votes.json"
+VOTES_VERSION     = "votes.version"          # tiny marker the page polls
+VOTES_DELTA       = "votes.delta.json"       # recent changes, keyed by version
+VOTES_EVENTS      = "votes.events"           # live delta stream (built-in web server only)
+FEED_KEEP         = 50                       # deltas kept before clients must resync
 ARCHIVE_DIR       = "archives"
 METADATA_FILE     = os.path.join(ARCHIVE_DIR, "archives.json")
-TWITCH_URL        = "https://twitch.tv/brucecooper"
+ARCHIVE_PAGE_SIZE = 25                       # weeks per archive index page
+STATE_DIR         = "state"                  # local-only bot state, never pushed
+CHANNELS_DIR      = "channels"               # per-channel output when serving several
+TWITCH_URL        = "https://twitch.tv/"
+DAILY_VOTE_LIMIT  = 5                        # different games a user may vote for per day
+ARCHIVE_WEEKDAY   = 5                        # weekly archive: Saturday...
+ARCHIVE_HOUR      = 0                        # ...at midnight Pacific
+SCHEDULE_MAX_SLEEP = 3600.0                  # longest the archive timer sleeps before rechecking
+STATS_TOP         = 5                        # games listed by !top, voters by !stats
+STATS_RECENT_WEEKS = 4                       # archived weeks !stats counts voters over
+PUBLISH_INTERVAL  = float(os.getenv("PUBLISH_INTERVAL", "10"))   # min seconds between pushes
+IRC_HOST          = os.getenv("IRC_HOST", "irc.chat.twitch.tv")
+IRC_PORT          = int(os.getenv("IRC_PORT", "6667"))
+PING_INTERVAL     = 60                       # seconds between keepalive PINGs
+JOIN_LIMIT        = 20                       # Twitch: channels joined per JOIN_WINDOW
+JOIN_WINDOW       = 10.0
+READ_LIMIT        = 64 * 1024                # longest IRC line we accept
+HTTP_PORT         = int(os.getenv("HTTP_PORT", "0"))   # serve the pages ourselves; 0 = off
+HTTP_HOST         = os.getenv("HTTP_HOST", "127.0.0.1")
+HTTP_IDLE         = 30.0                     # seconds a keep-alive connection may sit idle
+LIVE_INTERVAL     = 0.05                     # coalescing window for live pushes
+SSE_PING          = 15.0                     # keepalive comment to idle event streams
+SSE_MAX_BUFFER    = 256 * 1024               # unsent bytes before a stalled stream is dropped
+BOT_IS_MOD        = os.getenv("BOT_IS_MOD", "").lower() in ("1", "true", "yes")
+CHAT_LIMIT        = 100 if BOT_IS_MOD else 20  # Twitch: messages per CHAT_WINDOW
+CHAT_WINDOW       = 30.0
+CHAT_MAX_LEN      = 500                      # Twitch drops longer PRIVMSGs
+OUTBOX_MAX        = 1000                     # queued replies before we start dropping
+TWITCH_API_URL    = os.getenv("TWITCH_API_URL", "https://api.twitch.tv/helix/")
+STEAM_SEARCH_URL  = os.getenv("STEAM_SEARCH_URL", "https://store.steampowered.com/search/")
+STEAM_CACHE_FILE  = os.path.join(STATE_DIR, "steam_cache.sqlite3")
+MEME_CACHE_FILE   = os.path.join(STATE_DIR, "emotes.json")
+MEME_REFRESH      = 24 * 3600                # re-fetch the Twitch emote list after a day
+MEME_FALLBACK     = "https://i.imgur.com/0rR9O4N.jpeg"
+STEAM_HIT_TTL     = 30 * 24 * 3600           # keep found store links for a month
+STEAM_MISS_TTL    = 24 * 3600                # retry "not on Steam" after a day
+STEAM_CACHE_MAX   = 5000                     # LRU-evict beyond this many queries
+STEAM_WORKERS     = 4                        # concurrent Steam lookups
+WAL_SYNC_EVERY    = 64                       # fsync the vote log after this many events
+WAL_SYNC_INTERVAL = 1.0                      # ...or after this many seconds
+WAL_SNAPSHOT_EVERY = 10000                   # events between full state snapshots, at least...
+WAL_SNAPSHOT_RATIO = 0.02                    # ...and at least this fraction of the votes held
+WAL_REPLAY_BATCH  = 1 << 20                  # characters of log parsed per json.loads on replay
+WAL_SNAPSHOT_SLICE = 1 << 12                 # items per C call when writing a snapshot (each holds the GIL)
+METRICS_PORT      = int(os.getenv("METRICS_PORT", "0"))          # Prometheus text endpoint; 0 = off
+METRICS_HOST      = "127.0.0.1"              # metrics stay local, whatever HTTP_HOST is
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))   # seconds between log lines; 0 = off
+PROFILE_FILE      = os.getenv("PROFILE_FILE", "")                # opt-in cProfile sampling output
+PROFILE_WINDOW    = 5.0                      # seconds profiled...
+PROFILE_EVERY     = 60.0                     # ...out of every this many
 
 # ====== STATE ======
 PST                   = pytz.timezone("America/Los_Angeles")
-game_suggestions      = {}                   # key -> {"name","votes","url","user","time"}
-user_votes            = defaultdict(dict)    # user_votes[user][key] = week_id
-user_daily_counts     = defaultdict(lambda: defaultdict(int))
-vote_history          = []                   # [(key, user), …]
-last_message_time     = 0
-MESSAGE_COOLDOWN      = 0.3
-last_archive_date     = None
-pending_clear         = False                # for !voteremove all
-pending_delete_fname  = None                 # for specific archive deletion
-pending_delete_all    = False                # for delete all archives
 
 # ====== HELPERS ======
 def fetch_meme_urls():
+    """Global emote images from the Twitch API. Blocking; errors propagate."""
+    import requests
+    token = OAUTH_TOKEN.split("oauth:")[-1]
+    headers = {"Client-ID": CLIENT_ID, "Authorization": f"Bearer {token}"}
+    r = requests.get(TWITCH_API_URL + "chat/emotes/global", headers=headers, timeout=5)
+    r.raise_for_status()
+    return [e["images"]["url_4x"] for e in r.json().get("data", []) if e.get("images",{}).get("url_4x")]
+
+_meme_cache = None                           # {"fetched": unix time, "urls": [...]}
+
+def _read_meme_cache():
+    global _meme_cache
+    if _meme_cache is None:
+        try:
+            with open(MEME_CACHE_FILE, encoding="utf-8") as f:
+                _meme_cache = json.load(f)
+        except (OSError, ValueError):
+            _meme_cache = {"fetched": 0, "urls": []}
+    return _meme_cache
+
+def meme_urls():
+    """Emote backgrounds for the vote page, without touching the network:
+    the list cached on disk however old, else a stock image."""
+    return _read_meme_cache()["urls"] or [MEME_FALLBACK]
+
+def refresh_meme_urls(max_age=MEME_REFRESH):
+    """Re-fetch the emote list once the cached one is max_age old.
+    Blocking, so run it off the event loop. True if the list changed."""
+    global _meme_cache
+    cache = _read_meme_cache()
+    if time.time() - cache["fetched"] < max_age:
+        return False
     try:
-        token = OAUTH_TOKEN.split("oauth:")[-1]
-        headers = {"Client-ID": CLIENT_ID, "Authorization": f"Bearer {token}"}
-        r = requests.get("https://api.twitch.tv/helix/chat/emotes/global", headers=headers, timeout=5)
-        r.raise_for_status()
-        return [e["images"]["url_4x"] for e in r.json().get("data", []) if e.get("images",{}).get("url_4x")] \
-               or ["https://i.imgur.com/0rR9O4N.jpeg"]
-    except:
-        return ["https://i.imgur.com/0rR9O4N.jpeg"]
+        urls = fetch_meme_urls()
+    except Exception:
+        return False                         # keep the old list, try again next time
+    if not urls:
+        return False
+    _meme_cache = {"fetched": time.time(), "urls": urls}
+    os.makedirs(os.path.dirname(MEME_CACHE_FILE) or ".", exist_ok=True)
+    write_atomic(MEME_CACHE_FILE, json.dumps(_meme_cache))
+    return urls != cache["urls"]
 
-MEME_URLS = fetch_meme_urls()
 ACCENTS   = ["#ff0044", "#00ff88", "#ffaa00", "#00ccff", "#ff00cc"]
 
-def send_chat(sock, message):
-    global last_message_time
-    now = time.time()
-    if now - last_message_time < MESSAGE_COOLDOWN:
-        time.sleep(MESSAGE_COOLDOWN)
-    sock.send(f"PRIVMSG {CHANNEL} :{message}\r\n".encode())
-    last_message_time = now
+def send_chat(ch, message):
+    outbox.say(ch.irc, message)
 
 def get_current_pst_datetime():
     return datetime.datetime.now(PST)
@@ -69,61 +150,1176 @@ def get_current_pst_datetime():
 def get_current_vote_week():
     return get_current_pst_datetime().strftime("%Y-W%U")
 
+def steam_search(name):
+    """(title, url) of the best Steam match, None if there is none.
+
+    Network and HTTP errors propagate so callers can tell them from a miss.
+    """
+    import requests
+    from bs4 import BeautifulSoup
+    url = STEAM_SEARCH_URL + "?term=" + quote_plus(name)
+    r = requests.get(url, headers={"User-Agent":"Mozilla"}, timeout=5)
+    r.raise_for_status()
+    soup = BeautifulSoup(r.text, "html.parser")
+    row = soup.select_one("a.search_result_row")
+    if row:
+        title = row.select_one("span.title").text.strip()
+        if difflib.SequenceMatcher(None, name.lower(), title.lower()).ratio() > 0.7:
+            return title, row["href"].split("?")[0]
+    return None
+
 def find_steam_link(name):
     try:
-        url = "https://store.steampowered.com/search/?term=" + quote_plus(name)
-        r = requests.get(url, headers={"User-Agent":"Mozilla"}, timeout=5)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        row = soup.select_one("a.search_result_row")
-        if row:
-            title = row.select_one("span.title").text.strip()
-            if difflib.SequenceMatcher(None, name.lower(), title.lower()).ratio() > 0.7:
-                return title, row["href"].split("?")[0]
+        return steam_search(name)
     except:
-        pass
-    return None
+        return None
+
+# ====== METRICS ======
+class Histogram:
+    """Counts of observed durations in fixed buckets, Prometheus-style.
+
+    Observing is a bisect and three additions, cheap enough to leave on
+    for every vote. Bucket counts are kept per bucket and only made
+    cumulative when rendered.
+    """
+    __slots__ = ("counts", "sum", "count")
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+               0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum    = 0.0
+        self.count  = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.sum   += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf past the last)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+class Metrics:
+    """Counters, stage timings and queue depths for the vote hot path.
+
+    Counters and histograms are plain in-memory numbers, updated from the
+    event loop thread. Numbers other objects already keep (queue depths,
+    the outbox's sent count) are registered as callables and only read
+    when rendered. A name may carry Prometheus labels:
+    'rejected_total{reason="daily_limit"}'.
+    """
+    PREFIX = "twitch_vote_bot_"
+
+    def __init__(self):
+        self.counters = defaultdict(int)     # name -> count
+        self.timings  = defaultdict(Histogram)   # stage -> Histogram
+        self.gauges   = {}                   # name -> (callable, "gauge" or "counter")
+
+    def inc(self, name, n=1):
+        self.counters[name] += n
+
+    def observe(self, stage, seconds):
+        self.timings[stage].observe(seconds)
+
+    def gauge(self, name, fn, kind="gauge"):
+        self.gauges[name] = (fn, kind)
+
+    def render(self):
+        """Prometheus text exposition format."""
+        p, out, typed = self.PREFIX, [], set()
+        def head(name, kind):
+            base = name.partition("{")[0]
+            if base not in typed:
+                typed.add(base)
+                out.append(f"# TYPE {p}{base} {kind}")
+        for name in sorted(self.counters):
+            head(name, "counter")
+            out.append(f"{p}{name} {self.counters[name]}")
+        for name in sorted(self.gauges):
+            fn, kind = self.gauges[name]
+            try:
+                value = fn()
+            except Exception:
+                continue
+            head(name, kind)
+            out.append(f"{p}{name} {value}")
+        for stage in sorted(self.timings):
+            h, name = self.timings[stage], f"{stage}_seconds"
+            head(name, "histogram")
+            seen = 0
+            for bound, n in zip(h.BUCKETS, h.counts):
+                seen += n
+                out.append(f'{p}{name}_bucket{{le="{bound}"}} {seen}')
+            out.append(f'{p}{name}_bucket{{le="+Inf"}} {h.count}')
+            out.append(f"{p}{name}_sum {h.sum:.6f}")
+            out.append(f"{p}{name}_count {h.count}")
+        return "\n".join(out) + "\n"
+
+    def summary(self, last):
+        """One log line: counters (with the change since `last`), stage
+        p50/p99 and queue depths. Returns (line, counters for next time)."""
+        parts = []
+        for name in sorted(self.counters):
+            n = self.counters[name]
+            parts.append(f"{name.replace('_total', '')} {n} (+{n - last.get(name, 0)})")
+        for stage in sorted(self.timings):
+            h = self.timings[stage]
+            parts.append(f"{stage} p50/p99 {h.quantile(0.5)*1e3:g}/{h.quantile(0.99)*1e3:g} ms")
+        for name in sorted(self.gauges):
+            try:
+                parts.append(f"{name} {self.gauges[name][0]()}")
+            except Exception:
+                pass
+        return "📈 " + " | ".join(parts), dict(self.counters)
+
+metrics = Metrics()
+
+def timed(stage):
+    """Decorator: observe each call's duration under `stage`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.observe(stage, time.perf_counter() - t)
+        return inner
+    return wrap
+
+async def metrics_log_loop(interval):
+    """Print the metrics summary every `interval` seconds."""
+    last = {}
+    while True:
+        await asyncio.sleep(interval)
+        line, last = metrics.summary(last)
+        print(line)
+
+async def serve_metrics(host=METRICS_HOST, port=METRICS_PORT):
+    """Local endpoint answering every GET with metrics.render()."""
+    async def handle(reader, writer):
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HTTP_IDLE)
+            body = metrics.render().encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         b"Connection: close\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        writer.close()
+    server = await asyncio.start_server(handle, host, port)
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
+
+async def profile_loop(path, window=PROFILE_WINDOW, every=PROFILE_EVERY):
+    """Opt-in sampling profiler: cProfile the event loop thread for
+    `window` seconds out of every `every`, adding each window into one
+    pstats file at `path` (read it with python -m pstats)."""
+    import cProfile, pstats
+    prof, stats = cProfile.Profile(), None
+    while True:
+        await asyncio.sleep(every - window)
+        prof.enable()
+        try:
+            await asyncio.sleep(window)
+        finally:
+            prof.disable()
+        if stats is None:
+            stats = pstats.Stats(prof)
+        else:
+            stats.add(prof)
+        prof = cProfile.Profile()
+        stats.dump_stats(path)
+
+# ====== STEAM CACHE ======
+class SteamCache:
+    """On-disk cache of Steam lookups keyed by normalized query.
+
+    Found games and misses are both cached, with separate TTLs, so a typo
+    repeated by half of chat costs one request. Entries are mirrored in an
+    OrderedDict for LRU order; the SQLite file makes them survive restarts.
+    Lookups run on a small dedicated thread pool and concurrent requests for
+    the same query share one fetch. Writes to SQLite are queued and
+    committed in batches on the pool as well, never on the event loop.
+    """
+    def __init__(self, path=STEAM_CACHE_FILE, hit_ttl=STEAM_HIT_TTL, miss_ttl=STEAM_MISS_TTL,
+                 max_entries=STEAM_CACHE_MAX, workers=STEAM_WORKERS):
+        self.path        = path
+        self.hit_ttl     = hit_ttl
+        self.miss_ttl    = miss_ttl
+        self.max_entries = max_entries
+        self.workers     = workers
+        self.hits = self.misses = self.errors = 0
+        self._entries    = None           # query -> (title, url, expires); title None = miss
+        self._db         = None
+        self._pool       = None
+        self._inflight   = {}             # query -> asyncio.Future
+        self._pending    = {}             # query -> row to write, None to delete
+        self._queue_lock = threading.Lock()
+        self._db_lock    = threading.Lock()
+        self._flushing   = False          # a flush is queued on the pool
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS steam_cache (
+                              query TEXT PRIMARY KEY, title TEXT, url TEXT,
+                              expires REAL, used REAL)""")
+        now = time.time()
+        self._db.execute("DELETE FROM steam_cache WHERE expires < ?", (now,))
+        self._db.commit()
+        self._entries = OrderedDict(
+            (q, (t, u, e)) for q, t, u, e in
+            self._db.execute("SELECT query, title, url, expires FROM steam_cache ORDER BY used"))
+
+    def get(self, query):
+        """Cached (found, result) for query, or None if we have to ask Steam."""
+        self._load()
+        q = self.normalize(query)
+        entry = self._entries.get(q)
+        if entry is None or entry[2] < time.time():
+            return None
+        self._entries.move_to_end(q)
+        self.hits += 1
+        title, url, _ = entry
+        return (title is not None, (title, url) if title is not None else None)
+
+    def put(self, query, result):
+        self._load()
+        q   = self.normalize(query)
+        now = time.time()
+        title, url = result if result else (None, None)
+        expires = now + (self.hit_ttl if result else self.miss_ttl)
+        self._entries[q] = (title, url, expires)
+        self._entries.move_to_end(q)
+        with self._queue_lock:
+            self._pending[q] = (q, title, url, expires, now)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._pending[old] = None
+
+    def flush(self):
+        """Write the queued puts and evictions to SQLite in one transaction."""
+        self._flushing = False
+        with self._queue_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._db_lock:
+            self._db.executemany("INSERT OR REPLACE INTO steam_cache VALUES (?,?,?,?,?)",
+                                 [row for row in pending.values() if row is not None])
+            self._db.executemany("DELETE FROM steam_cache WHERE query = ?",
+                                 [(q,) for q, row in pending.items() if row is None])
+            self._db.commit()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.close()
+            self._db = self._entries = None
+
+    async def resolve(self, query):
+        """(title, url) for query, from the cache or a pooled Steam request."""
+        cached = self.get(query)
+        if cached is not None:
+            return cached[1]
+        q = self.normalize(query)
+        if q in self._inflight:
+            return await asyncio.shield(self._inflight[q])
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="steam")
+        loop = asyncio.get_running_loop()
+        fut  = loop.create_future()
+        self._inflight[q] = fut
+        self.misses += 1
+        t, result = time.perf_counter(), None
+        try:
+            result = await loop.run_in_executor(self._pool, steam_search, query)
+        except Exception:
+            # network trouble is not a verdict; don't cache it
+            self.errors += 1
+        else:
+            self.put(query, result)
+            if not self._flushing:
+                self._flushing = True
+                loop.run_in_executor(self._pool, self.flush)
+        finally:
+            del self._inflight[q]
+            metrics.observe("steam_lookup", time.perf_counter() - t)
+            # even if this lookup was cancelled: callers sharing it are waiting
+            fut.set_result(result)
+        return result
+
+steam_cache = SteamCache()
+
+# ====== LEADERBOARD ======
+class GameEntry:
+    """One suggested game. Slotted: a raid week can collect thousands.
+    order numbers suggestions as they arrive, and breaks ties in the ranking."""
+    __slots__ = ("key", "name", "votes", "url", "user", "time", "order")
+
+    def __init__(self, key, name, url, user, order=None):
+        self.key, self.name, self.url, self.user = key, name, url, user
+        self.votes, self.time, self.order = 0, "", order
+
+    @classmethod
+    def from_row(cls, row):
+        key, name, url, user, time_, votes, *order = row   # older snapshots have no order
+        entry = cls(key, name, url, user, order[0] if order else None)
+        entry.time, entry.votes = time_, votes
+        return entry
+
+    def as_dict(self):
+        return {"key": self.key, "name": self.name, "votes": self.votes, "url": self.url,
+                "user": self.user, "time": self.time}
+
+_by_order = operator.attrgetter("order")
+
+class Leaderboard:
+    """Suggestions kept ranked by votes, most first, as votes come and go.
+
+    Entries are grouped into runs by vote count: _runs maps a count to its
+    entries sorted by order, and _counts lists the counts in use. A vote
+    takes the entry out of one run and into the next with two bisections,
+    so increment and decrement are O(log n), and iterating walks the runs
+    from the top with no sort. Ties rank in the order the games were
+    suggested, as the page's stable sort always showed them, and a vote
+    never moves any game but the one voted for.
+
+    Every entry whose votes or details changed is remembered until
+    drain_changes(), which is what the delta feed is built from. The page
+    places cards by (votes, order) itself.
+    """
+    def __init__(self):
+        self._entries    = {}        # key -> GameEntry
+        self._runs       = {}        # votes -> [GameEntry, …] by order
+        self._counts     = []        # vote counts that have a run, ascending
+        self._next       = 0         # order of the next new entry
+        self._changed    = set()     # keys to resend since the last drain
+        self._removed    = set()     # keys gone since the last drain
+        self._reset      = True      # everything changed (startup, clear)
+        self.total_votes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        runs = self._runs
+        for v in reversed(self._counts):
+            yield from runs[v]
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def top(self, n):
+        return list(itertools.islice(self, n))
+
+    def clear(self):
+        self._entries.clear(); self._runs.clear(); self._counts.clear()
+        self._changed.clear(); self._removed.clear()
+        self._next  = 0
+        self._reset = True
+        self.total_votes = 0
+
+    def restore(self, entries):
+        """Load entries already in ranked order (from a snapshot or a replay).
+        Entries without an order are numbered as they come, keeping ties as
+        they were ranked."""
+        self.clear()
+        for entry in entries:
+            if entry.order is None:
+                entry.order = self._next
+            self._next = max(self._next, entry.order + 1)
+            self._entries[entry.key] = entry
+            self._runs.setdefault(entry.votes, []).append(entry)
+            self.total_votes += entry.votes
+        for run in self._runs.values():
+            run.sort(key=_by_order)
+        self._counts = sorted(self._runs)
+
+    def touch(self, key):
+        """Flag an entry whose name/url/user was edited in place."""
+        self._changed.add(key)
+
+    def drain_changes(self):
+        """(reset, changed entries, removed keys) since the previous call."""
+        reset = self._reset
+        changed = [self._entries[k] for k in self._changed if k in self._entries]
+        removed = sorted(self._removed)
+        self._changed.clear(); self._removed.clear()
+        self._reset = False
+        return reset, changed, removed
+
+    def _put(self, entry):
+        run = self._runs.get(entry.votes)
+        if run is None:
+            self._runs[entry.votes] = [entry]
+            bisect.insort(self._counts, entry.votes)
+        else:
+            bisect.insort(run, entry, key=_by_order)
+
+    def _take(self, entry):
+        run = self._runs[entry.votes]
+        del run[bisect.bisect_left(run, entry.order, key=_by_order)]
+        if not run:
+            del self._runs[entry.votes]
+            del self._counts[bisect.bisect_left(self._counts, entry.votes)]
+
+    def add(self, key, name, url, user):
+        """New entry with 0 votes (the bottom run). Returns the existing one if any."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = GameEntry(key, name, url, user, self._next)
+            self._next += 1
+            self._put(entry)
+            self._changed.add(key); self._removed.discard(key)
+        return entry
+
+    def increment(self, key, n=1):
+        entry = self._entries[key]
+        self._take(entry)
+        entry.votes += n
+        self._put(entry)
+        self.total_votes += n
+        self._changed.add(key)
+        return entry
+
+    def decrement(self, key):
+        entry = self._entries[key]
+        if entry.votes <= 0:
+            return entry
+        self._take(entry)
+        entry.votes -= 1
+        self._put(entry)
+        self.total_votes -= 1
+        self._changed.add(key)
+        return entry
+
+    def remove(self, key):
+        """Drop an entry that is down to 0 votes (it sits in the bottom run)."""
+        entry = self._entries[key]
+        if entry.votes:
+            raise ValueError(f"{key!r} still has {entry.votes} votes")
+        self._take(entry)
+        del self._entries[key]
+        self._changed.discard(key); self._removed.add(key)
+
+# ====== VOTE LIMITS ======
+def _store(column, indexes, values):
+    """column[i] = v for each i, v, without a Python loop."""
+    deque(map(column.__setitem__, indexes, values), maxlen=0)
+
+class Runs:
+    """A column whose values change rarely, like the day of each vote in a
+    log, kept as the value and start of each run of equal values."""
+    __slots__ = ("values", "starts", "size")
+
+    def __init__(self):
+        self.values, self.starts, self.size = [], [], 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self.values[bisect.bisect_right(self.starts, i) - 1]
+
+    def extend(self, column):
+        for value, run in itertools.groupby(column):
+            if not self.values or value != self.values[-1]:
+                self.values.append(value); self.starts.append(self.size)
+            self.size += len(list(run))
+
+class VoteLimiter:
+    """Per-user vote limits: votes today, and the games voted for this week.
+
+    Chatters are interned to small ints. Each user has fixed-size counters
+    in parallel arrays: a day stamp and count, and a week stamp with a small
+    tuple of game keys. A counter stamped with an older day or week just
+    reads as empty, so stale days expire without a sweep. Reads never
+    allocate, and only a counted vote gives a chatter an id.
+    """
+    def __init__(self):
+        self._ids       = {}                 # user -> id
+        self._users     = []                 # id -> user
+        self._day       = array("i")         # id -> stamp of the day counted
+        self._day_count = array("H")         # id -> votes on that day
+        self._week      = array("i")         # id -> stamp of the week below
+        self._week_keys = []                 # id -> tuple of game keys voted that week
+        self._stamps    = {}                 # "2025-07-16" / "2025-W28" -> int
+
+    def __len__(self):
+        return len(self._users)
+
+    def _stamp(self, label):
+        stamp = self._stamps.get(label)
+        if stamp is None:
+            stamp = self._stamps[label] = len(self._stamps) + 1
+        return stamp
+
+    def _intern(self, user):
+        uid = self._ids.get(user)
+        if uid is None:
+            user = sys.intern(user)
+            uid  = self._ids[user] = len(self._users)
+            self._users.append(user)
+            self._day.append(0); self._day_count.append(0)
+            self._week.append(0); self._week_keys.append(())
+        return uid
+
+    def votes_today(self, user, day):
+        uid = self._ids.get(user)
+        if uid is None or self._day[uid] != self._stamps.get(day):
+            return 0
+        return self._day_count[uid]
+
+    def has_voted(self, user, key, week):
+        uid = self._ids.get(user)
+        if uid is None or self._week[uid] != self._stamps.get(week):
+            return False
+        return key in self._week_keys[uid]
+
+    def count(self, user, key, day, week):
+        uid = self._intern(user)
+        d, w = self._stamp(day), self._stamp(week)
+        if self._day[uid] != d:
+            self._day[uid], self._day_count[uid] = d, 0
+        self._day_count[uid] += 1
+        if self._week[uid] != w:
+            self._week[uid], self._week_keys[uid] = w, ()
+        if key not in self._week_keys[uid]:
+            self._week_keys[uid] += (sys.intern(key),)
+
+    def count_all(self, votes, keys, days, weeks, edits):
+        """count() for every vote of a replayed log, oldest first, a column
+        at a time. votes maps each chatter to the indexes of their votes in
+        keys, in order of first vote; days and weeks are Runs. Days and
+        weeks only move forward, so a chatter's counters end up holding
+        their votes on the day and in the week of their last.
+
+        edits holds the forget() and rekey() calls made between the votes,
+        as user -> [(votes before it, "forget" or "rekey", key, new)]. The
+        week's games of those chatters are counted again a vote at a time.
+        """
+        ids = self._ids
+        saved = {user: (self._week[ids[user]], self._week_keys[ids[user]]) for user in edits if user in ids}
+        new = list(map(sys.intern, [user for user in votes if user not in ids]))
+        ids.update(zip(new, itertools.count(len(self._users))))
+        self._users += new
+        self._day += array("i", [0]) * len(new); self._day_count += array("H", [0]) * len(new)
+        self._week += array("i", [0]) * len(new); self._week_keys += [()] * len(new)
+        uids, lists = list(map(ids.__getitem__, votes)), list(votes.values())
+        last = list(map(operator.itemgetter(-1), lists))
+
+        stamps, counted = {}, []
+        for runs in (days, weeks):
+            run = [r - 1 for r in map(bisect.bisect_right, itertools.repeat(runs.starts), last)]
+            stamps.update((label, self._stamp(label)) for label in runs.values)
+            since = list(map(bisect.bisect_left, lists, map(runs.starts.__getitem__, run)))
+            counted.append((list(map(stamps.__getitem__, map(runs.values.__getitem__, run))), since))
+        (day, since_day), (week, since_week) = counted
+
+        n = map(operator.sub, map(len, lists), since_day)      # votes on the day of their last
+        same = map(operator.eq, map(self._day.__getitem__, uids), day)
+        n = list(map(operator.add, n, map(operator.mul, same, map(self._day_count.__getitem__, uids))))
+        _store(self._day, uids, day); _store(self._day_count, uids, n)
+
+        held = map(map, itertools.repeat(keys.__getitem__), map(itertools.islice, lists, since_week, itertools.repeat(None)))
+        held = list(map(tuple, map(dict.fromkeys, held)))      # games in the week of their last
+        for p in itertools.compress(itertools.count(), map(operator.eq, map(self._week.__getitem__, uids), week)):
+            held[p] = tuple(dict.fromkeys(self._week_keys[uids[p]] + held[p]))   # same week as before the log
+        _store(self._week, uids, week); _store(self._week_keys, uids, held)
+
+        for user, calls in edits.items():
+            uid = ids.get(user)
+            if uid is None:                  # never counted: nothing to forget
+                continue
+            wk, held = saved[user] if user in saved else (0, ())
+            theirs, done = votes.get(user, ()), 0
+            for cut, op, key, new in calls + [(len(keys), None, None, None)]:
+                upto = bisect.bisect_left(theirs, cut, done)
+                if upto > done:              # their votes since the last call
+                    run = bisect.bisect_right(weeks.starts, theirs[upto - 1]) - 1
+                    if self._stamps[weeks.values[run]] != wk:
+                        wk, held = self._stamps[weeks.values[run]], ()
+                        done = bisect.bisect_left(theirs, weeks.starts[run], done)
+                    held = tuple(dict.fromkeys(held + tuple(map(keys.__getitem__, theirs[done:upto]))))
+                done = upto
+                self._week[uid], self._week_keys[uid] = wk, held
+                if op == "forget":
+                    self.forget(user, key)
+                elif op == "rekey":
+                    self.rekey([user], key, new)
+                wk, held = self._week[uid], self._week_keys[uid]
+
+    def forget(self, user, key):
+        """Let user vote for key again this week (their vote was removed)."""
+        uid = self._ids.get(user)
+        if uid is not None and key in self._week_keys[uid]:
+            self._week_keys[uid] = tuple(k for k in self._week_keys[uid] if k != key)
+
+    def rekey(self, users, key, new):
+        """key turned out to be the same game as new: users' votes for key count for new."""
+        new = sys.intern(new)
+        for user in users:
+            uid = self._ids.get(user)
+            if uid is not None and key in self._week_keys[uid]:
+                keys = tuple(k for k in self._week_keys[uid] if k != key)
+                self._week_keys[uid] = keys if new in keys else keys + (new,)
+
+    def clear(self):
+        self._ids.clear(); self._users.clear(); self._stamps.clear()
+        del self._day[:], self._day_count[:], self._week[:], self._week_keys[:]
+
+    def copy(self):
+        """A copy to dump() elsewhere while this one keeps counting. Every
+        field is one C-level copy, cheap enough to take on the event loop."""
+        other = VoteLimiter()
+        other._ids, other._users, other._stamps = dict(self._ids), list(self._users), dict(self._stamps)
+        other._day, other._day_count = array("i", self._day), array("H", self._day_count)
+        other._week, other._week_keys = array("i", self._week), list(self._week_keys)
+        return other
+
+    def dump(self):
+        """The parallel arrays as columns, stamps as their labels. Built with
+        map() and nothing allocated per chatter, as it runs beside the loop."""
+        labels = {v: k for k, v in self._stamps.items()}
+        return {"users": list(self._users),
+                "day":   list(map(labels.get, self._day)),  "day_count": list(self._day_count),
+                "week":  list(map(labels.get, self._week)), "week_keys": list(self._week_keys)}
+
+    def load(self, data):
+        """Rebuild from dump(), a column at a time rather than per user."""
+        self.clear()
+        self._users = list(map(sys.intern, data["users"]))
+        self._ids   = dict(zip(self._users, range(len(self._users))))
+        stamps = {None: 0}
+        stamps.update((label, self._stamp(label)) for label in set(data["day"] + data["week"]) - {None})
+        self._day       = array("i", map(stamps.__getitem__, data["day"]))
+        self._day_count = array("H", data["day_count"])
+        self._week      = array("i", map(stamps.__getitem__, data["week"]))
+        self._week_keys = [tuple(map(sys.intern, keys)) for keys in data["week_keys"]]
+
+    def load_rows(self, data):
+        """Rebuild from older snapshots: {user: [day, count, week, keys]}."""
+        rows = data.values()
+        self.load({"users": list(data), "day": [r[0] for r in rows], "day_count": [r[1] for r in rows],
+                   "week": [r[2] for r in rows], "week_keys": [r[3] if r[2] is not None else () for r in rows]})
+
+# ====== VOTE HISTORY ======
+class Ballot:
+    """One counted vote, as the history's lookups return it."""
+    __slots__ = ("key", "user")
+
+    def __init__(self, key, user):
+        self.key, self.user = key, user
+
+class VoteHistory:
+    """Every vote this week, undoable newest-first by user, by game or overall.
+
+    Votes are kept as columns, a vote being its index: its key, its user
+    and whether it still stands. Each game and each user has a stack of
+    vote indexes. Removing a vote only clears its flag. Dead votes are
+    popped off a game's stack as they surface, so its last live vote is
+    found in amortised O(1); a user's stack keeps them, and is scanned,
+    as the daily limit keeps it short. The last vote of all is one rfind()
+    over the flags. The columns only grow until clear(), so an index
+    stays valid all week.
+    """
+    def __init__(self):
+        self._keys    = []                   # vote -> key (rekey() rewrites it)
+        self._users   = []                   # vote -> user
+        self._alive   = bytearray()          # vote -> 1 while it stands
+        self._by_user = defaultdict(list)    # user -> [vote, …], by first vote
+        self._by_game = defaultdict(list)    # key  -> [vote, …]
+        self._live    = 0
+        self._journals = []                  # per capture() being read: vote -> (key, alive)
+        self._lock    = threading.Lock()     # guards _journals, read from a snapshot thread
+
+    def __len__(self):
+        return self._live
+
+    def __iter__(self):
+        return map(Ballot, *self.columns())
+
+    def clear(self):
+        # new columns rather than emptied ones: a capture() may still be reading these
+        self._keys, self._users, self._alive = [], [], bytearray()
+        self._by_user.clear(); self._by_game.clear()
+        self._live = 0
+        with self._lock:
+            self._journals = []
+
+    def add(self, key, user):
+        i = len(self._keys)
+        self._keys.append(key); self._users.append(user); self._alive.append(1)
+        self._by_user[user].append(i)
+        self._by_game[key].append(i)
+        self._live += 1
+
+    @property
+    def cast(self):
+        """Votes added since clear(), removed ones too: the next one's index."""
+        return len(self._keys)
+
+    def _top(self, stack):
+        while stack and not self._alive[stack[-1]]:
+            stack.pop()
+        return Ballot(self._keys[stack[-1]], self._users[stack[-1]]) if stack else None
+
+    def last(self):
+        i = self._alive.rfind(1)
+        return Ballot(self._keys[i], self._users[i]) if i >= 0 else None
+
+    def last_by(self, user):
+        for i in reversed(self._by_user.get(user) or ()):
+            if self._alive[i]:
+                return Ballot(self._keys[i], user)
+        return None
+
+    def last_for(self, key):
+        stack = self._by_game.get(key)
+        return self._top(stack) if stack is not None else None
+
+    def remove(self, key, user):
+        """Drop user's latest vote for key."""
+        for i in reversed(self._by_user.get(user) or ()):
+            if self._alive[i] and self._keys[i] == key:
+                break
+        else:
+            return None
+        self._note(i)
+        self._alive[i] = 0
+        self._live -= 1
+        if self._top(self._by_game[key]) is None:
+            del self._by_game[key]
+        return Ballot(key, user)
+
+    def count_by(self, user, key):
+        return sum(self._alive[i] and self._keys[i] == key for i in self._by_user.get(user) or ())
+
+    def rekey(self, key, new):
+        """Re-file key's votes under new; returns their users. If new
+        already has votes, the two stacks are merged in voting order."""
+        src = [i for i in self._by_game.pop(key, ()) if self._alive[i]]
+        for i in src:
+            self._note(i)
+            self._keys[i] = new
+        if src:
+            dst = self._by_game.get(new)
+            self._by_game[new] = sorted(dst + src) if dst else src
+        return list(map(self._users.__getitem__, src))
+
+    def votes_by_user(self, start=0):
+        """user -> indexes of their votes from index start on, removed ones
+        too, counted from start; in order of first vote. For replay, which
+        gives the limiter a log's votes a chatter at a time."""
+        if not start:
+            return dict(self._by_user)
+        return {user: [i - start for i in stack[bisect.bisect_left(stack, start):]]
+                for user, stack in self._by_user.items() if stack[-1] >= start}
+
+    def columns(self):
+        """(keys, users) of the live votes, oldest first."""
+        return (list(itertools.compress(self._keys, self._alive)),
+                list(itertools.compress(self._users, self._alive)))
+
+    @staticmethod
+    def id_columns(keys, users, size=WAL_SNAPSHOT_SLICE):
+        """Columns of small ids into key/user tables: a raid week holds a
+        million ballots, and ints parse far faster than [key, user] pairs.
+        Built a slice at a time, as it runs beside the event loop."""
+        data = {}
+        for name, column in (("keys", keys), ("users", users)):
+            ids, out = {}, []
+            for i in range(0, len(column), size):
+                part = column[i:i + size]
+                ids.update(zip([k for k in dict.fromkeys(part) if k not in ids], itertools.count(len(ids))))
+                out += map(ids.__getitem__, part)
+            data[name], data[name[:-1] + "_names"] = out, list(ids)
+        return data
+
+    def dump(self):
+        return self.id_columns(*self.columns())
+
+    def capture(self):
+        """Freeze the live votes for a snapshot. Returns a function giving
+        their (keys, users) as of now, meant to run in another thread.
+
+        Nothing is copied: the columns are only appended to, and votes
+        changed after this are journaled, so the function sees them as
+        they were. clear() starts new columns and leaves these be.
+        """
+        journal, journals = {}, self._journals
+        with self._lock:
+            journals.append(journal)
+        return functools.partial(self._columns_at, self._keys, self._users, self._alive,
+                                 len(self._keys), journals, journal)
+
+    def _note(self, i):
+        if self._journals:
+            with self._lock:
+                for journal in self._journals:
+                    journal.setdefault(i, (self._keys[i], self._alive[i]))
+
+    def _columns_at(self, keys, users, alive, n, journals, journal, size=WAL_SNAPSHOT_SLICE):
+        k, u, a = [], [], bytearray()
+        for i in range(0, n, size):
+            j = min(i + size, n)
+            k += keys[i:j]; u += users[i:j]; a += alive[i:j]
+        with self._lock:
+            journals.remove(journal)
+        for i, (key, was) in journal.items():
+            if i < n:                        # cast after the capture otherwise
+                k[i], a[i] = key, was
+        return list(itertools.compress(k, a)), list(itertools.compress(u, a))
+
+    def load(self, data):
+        """Rebuild from dump()."""
+        if isinstance(data, list):               # older snapshots: [key, user] pairs
+            keys, users = [k for k, _ in data], [u for _, u in data]
+        else:
+            keys  = list(map(data["key_names"].__getitem__, data["keys"]))
+            users = list(map(data["user_names"].__getitem__, data["users"]))
+        self.clear()
+        self.extend(keys, users)
+
+    def extend(self, keys, users):
+        """add() for each (key, user), oldest first. The stacks are filled
+        by map() over the columns, which keeps a million votes out of the
+        interpreter loop."""
+        votes = list(range(len(self._keys), len(self._keys) + len(keys)))
+        self._keys += keys; self._users += users; self._alive += b"\1" * len(votes)
+        for index, column in ((self._by_game, keys), (self._by_user, users)):
+            deque(map(list.append, map(index.__getitem__, column), votes), maxlen=0)
+        self._live += len(votes)
+
+# ====== GAME MATCHING ======
+ROMAN_NUMERALS  = {"ii":"2", "iii":"3", "iv":"4", "v":"5", "vi":"6", "vii":"7",
+                   "viii":"8", "ix":"9", "x":"10", "xi":"11", "xii":"12"}
+EDITION_SUFFIXES = ("game of the year edition", "goty edition", "goty", "definitive edition",
+                    "deluxe edition", "complete edition", "enhanced edition", "ultimate edition",
+                    "gold edition", "remastered", "directors cut")
+
+def normalize_game_name(name):
+    """Loose form of a title for alias lookups: 'The Witcher III: GOTY' -> 'witcher 3'."""
+    s = "".join(c if c.isalnum() else " " for c in name.lower().replace("'", ""))
+    words = [ROMAN_NUMERALS.get(w, w) for w in s.split()]
+    if words[:1] == ["the"]:
+        words = words[1:]
+    s = " ".join(words)
+    for suffix in EDITION_SUFFIXES:
+        if s.endswith(" " + suffix):
+            s = s[:-len(suffix) - 1]
+            break
+    return s
+
+class GameMatcher:
+    """Finds the suggestion a chat message refers to.
+
+    Gives the same answer as difflib.get_close_matches(query, keys, n=1,
+    cutoff) without scoring every key. Keys are indexed by their bigrams,
+    padded with a space at each end. If two strings share S bigrams
+    (counted as a multiset) and have combined length T, each matching block
+    of size s accounts for s-1 shared bigrams, and every gap between blocks
+    costs at least one unmatched character. That bounds the ratio at
+    2(S+T-1)/3T, which is always under 2/3 when S is 0. Candidates are
+    visited most-shared-first, and the scan stops once that bound (or the
+    length bound) can't beat the best score found so far.
+
+    If fuzzy matching finds nothing, normalize_game_name() aliases catch
+    'The Witcher III' vs 'witcher 3' style variants.
+    """
+    def __init__(self, cutoff=0.7):
+        self.cutoff   = cutoff
+        self._grams   = defaultdict(dict)    # bigram -> {key: occurrences}
+        self._keys    = {}                   # key -> {bigram: occurrences}
+        self._aliases = {}                   # normalized name -> key
+
+    @staticmethod
+    def _bigrams(s):
+        s = f" {s} "
+        counts = defaultdict(int)
+        for i in range(len(s) - 1):
+            counts[s[i:i+2]] += 1
+        return counts
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        if key in self._keys:
+            return
+        grams = self._bigrams(key)
+        self._keys[key] = grams
+        for g, n in grams.items():
+            self._grams[g][key] = n
+        self._aliases.setdefault(normalize_game_name(key), key)
+
+    def remove(self, key):
+        grams = self._keys.pop(key, None)
+        if grams is None:
+            return
+        for g in grams:
+            bucket = self._grams[g]
+            del bucket[key]
+            if not bucket:
+                del self._grams[g]
+        alias = normalize_game_name(key)
+        if self._aliases.get(alias) == key:
+            del self._aliases[alias]
+
+    def clear(self):
+        self._grams.clear(); self._keys.clear(); self._aliases.clear()
+
+    def match(self, query):
+        """Key for query, or None. query is compared lowercased, like before."""
+        query = query.lower()
+        if query in self._keys:
+            return query
+        best = self._fuzzy(query)
+        if best is not None:
+            return best
+        return self._aliases.get(normalize_game_name(query))
+
+    def _fuzzy(self, query):
+        shared = defaultdict(int)
+        for g, n in self._bigrams(query).items():
+            for key, m in self._grams.get(g, {}).items():
+                shared[key] += n if n < m else m
+        if self.cutoff <= 2 / 3:
+            # the bigram bound can't rule anything out this low
+            for key in self._keys:
+                shared.setdefault(key, 0)
+        by_shared = defaultdict(list)
+        for key, n in shared.items():
+            by_shared[n].append(key)
+
+        sm = difflib.SequenceMatcher()
+        sm.set_seq2(query)
+        lq, best, best_key = len(query), self.cutoff, None
+        floor = best - 1e-9                  # keep exact ties in play
+        t_min = lq + lq * floor / (2 - floor)
+        for n in sorted(by_shared, reverse=True):
+            if 2 * (n + t_min - 1) < floor * 3 * t_min:
+                break                        # nothing further down can reach best
+            for key in by_shared[n]:
+                t = lq + len(key)
+                if 2 * min(lq, len(key)) < floor * t or 2 * (n + t - 1) < floor * 3 * t:
+                    continue
+                sm.set_seq1(key)
+                if sm.quick_ratio() < floor:
+                    continue
+                score = sm.ratio()
+                if (score, key) > (best, best_key or ""):
+                    best, best_key = score, key
+                    floor = best - 1e-9
+                    t_min = lq + lq * floor / (2 - floor)
+        return best_key
+
+# ====== VOTE FEED ======
+class VoteFeed:
+    """Versioned snapshot plus a rolling delta log for the vote page.
+
+    Each record() that finds changes bumps the version and makes one
+    delta: the entries to (re)draw, with their order, and the keys to drop.
+    The page ranks cards by votes, then order, so a vote resends one card.
+    The page polls only VOTES_VERSION. When it is behind it fetches
+    VOTES_DELTA (cacheable, since the URL carries the version) and patches
+    the changed cards. It reloads the full VOTES_JSON snapshot only when it
+    has fallen further behind than the log reaches.
+
+    A delta covers the versions after "since" up to "seq", and holds each
+    entry as it ended up, so it applies to a page at any version between.
+    The live server records every LIVE_INTERVAL and streams each delta
+    (on_delta); the log only gets one per publish, merged from those since
+    the last, so its FEED_KEEP deltas reach back as many publishes however
+    often the stream moves. log() adds the unpublished ones, merged.
+    """
+    def __init__(self, keep=FEED_KEEP):
+        self.version  = 0
+        self.deltas   = deque(maxlen=keep)   # one per publish
+        self.on_delta = None
+        self._since   = None                 # version before the unpublished deltas, if any
+        self._reset   = False                # ...of which one redrew everything
+        self._set     = {}                   # key -> entry as last sent
+        self._del     = {}                   # keys dropped since, in order
+
+    def load(self, path):
+        """Continue numbering from the version last published to path."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.version = int(json.load(f)["version"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.version = 0
+
+    def record(self, board, publish=False):
+        """Turn the board's changes into a delta; with publish, also close
+        the unpublished ones into one for the log. Returns True if the
+        board had changed."""
+        reset, changed, removed = board.drain_changes()
+        if reset or changed or removed:
+            self.version += 1
+            delta = {"seq": self.version, "since": self.version - 1}
+            if reset:
+                delta["reset"] = True
+                changed = list(board)
+            if removed:
+                delta["del"] = removed
+            delta["set"] = [dict(e.as_dict(), order=e.order) for e in changed]
+            self._merge(delta)
+            if self.on_delta is not None:
+                self.on_delta(delta)
+        if publish and self._since is not None:
+            self.deltas.append(self._pending())
+            self._since, self._reset = None, False
+            self._set, self._del = {}, {}
+        return bool(reset or changed or removed)
+
+    def _merge(self, delta):
+        if self._since is None:
+            self._since = delta["since"]
+        if delta.get("reset"):
+            self._reset = True
+            self._set.clear(); self._del.clear()
+        for key in delta.get("del", ()):
+            self._set.pop(key, None)
+            self._del[key] = None
+        for game in delta["set"]:
+            self._set[game["key"]] = game
+            self._del.pop(game["key"], None)
+
+    def _pending(self):
+        delta = {"seq": self.version, "since": self._since}
+        if self._reset:
+            delta["reset"] = True
+        elif self._del:
+            delta["del"] = list(self._del)
+        delta["set"] = list(self._set.values())
+        return delta
+
+    def log(self):
+        """The published deltas, then the unpublished ones as one."""
+        return list(self.deltas) + ([self._pending()] if self._since is not None else [])
+
+    @property
+    def oldest(self):
+        """The oldest version a page can catch up from with log()."""
+        if self.deltas:
+            return self.deltas[0]["since"] + 1
+        return self._since + 1 if self._since is not None else self.version + 1
 
 # ====== PERSISTENCE ======
-def write_votes_json():
-    arr = []
-    for _, info in sorted(game_suggestions.items(), key=lambda kv: kv[1]["votes"], reverse=True):
-        arr.append({
-            "name":  info["name"],
-            "votes": info["votes"],
-            "url":   info["url"],
-            "user":  info["user"],
-            "time":  info["time"]
-        })
-    with open(VOTES_JSON, "w", encoding="utf-8") as vf:
-        json.dump(arr, vf, indent=2)
-
-def write_vote_file():
-    write_votes_json()
-
-    # build games list HTML
-    games_html = ""
-    for _, info in sorted(game_suggestions.items(), key=lambda kv: kv[1]["votes"], reverse=True):
-        lbl = "vote" if info["votes"] == 1 else "votes"
-        link_html = (f'<div class="store-link"><a href="{info["url"]}" target="_blank">'
-                     f'View on Store</a></div>' if info["url"] else "")
-        games_html += f"""
-      <div class="game">
-        <div class="votes">{info['votes']} {lbl}</div>
-        <div class="game-name">{info['name']}</div>
-        <div class="suggester">Suggested by: {info['user']} at {info['time']}</div>
+_written = {}                                # path -> sha1 of what is on disk
+
+def write_atomic(path, text):
+    """Write text to path via temp file + rename, skipping identical content.
+
+    Readers (the web server, git) only ever see the old or the new file.
+    Returns True if the file was (re)written.
+    """
+    data   = text.encode("utf-8")
+    digest = hashlib.sha1(data).digest()
+    if path not in _written and os.path.exists(path):
+        with open(path, "rb") as f:
+            _written[path] = hashlib.sha1(f.read()).digest()
+    if _written.get(path) == digest:
+        return False
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    _written[path] = digest
+    return True
+
+def remove_file(path):
+    """Delete a file, forgetting what write_atomic() knew about it."""
+    _written.pop(path, None)
+    if os.path.exists(path):
+        os.remove(path)
+
+def render_votes_json(ch):
+    feed = ch.feed
+    arr  = [dict(info.as_dict(), order=info.order) for info in ch.leaderboard]
+    return {
+        VOTES_JSON:    json.dumps({"version": feed.version, "games": arr}, indent=2),
+        VOTES_DELTA:   json.dumps({"version": feed.version, "deltas": feed.log()}),
+        # written last: a client that sees the new version finds the files above
+        VOTES_VERSION: json.dumps({"version": feed.version, "oldest": feed.oldest}),
+    }
+
+def render_card(info):
+    """One game's card. Names come straight from chat, so every field is escaped."""
+    lbl = "vote" if info.votes == 1 else "votes"
+    url = info.url or ""
+    link_html = (f'<div class="store-link"><a href="{html_escape(url, quote=True)}" target="_blank">'
+                 f'View on Store</a></div>' if url.startswith(("https://", "http://")) else "")
+    return f"""
+      <div class="game" data-key="{html_escape(info.key)}" data-votes="{info.votes}" data-order="{info.order}">
+        <div class="votes">{info.votes} {lbl}</div>
+        <div class="game-name">{html_escape(info.name)}</div>
+        <div class="suggester">Suggested by: {html_escape(info.user)} at {html_escape(info.time)}</div>
         {link_html}
       </div>"""
 
-    mem0     = MEME_URLS[0]
-    memes    = json.dumps(MEME_URLS)
+def render_game_cards(ch):
+    """Card HTML for the whole leaderboard, re-rendering only changed cards."""
+    parts, cache, board = [], ch.card_cache, ch.leaderboard
+    for info in board:
+        sig    = (info.votes, info.order, info.name, info.url, info.user, info.time)
+        cached = cache.get(info.key)
+        if cached is None or cached[0] != sig:
+            cached = cache[info.key] = (sig, render_card(info))
+        parts.append(cached[1])
+    if len(cache) > 2 * len(board) + 64:
+        live = {info.key for info in board}
+        for key in [k for k in cache if k not in live]:
+            del cache[key]
+    return "".join(parts)
+
+_PAGE_VERSION = "\x00version\x00"
+_PAGE_GAMES   = "\x00games\x00"
+
+def compile_vote_page(ch):
+    """Build the static part of index.html once; only version and cards vary."""
+    games_html = _PAGE_GAMES
+    urls     = meme_urls()
+    mem0     = urls[0]
+    memes    = json.dumps(urls)
     accents  = json.dumps(ACCENTS)
     vjson    = VOTES_JSON
+    vversion = VOTES_VERSION
+    vdelta   = VOTES_DELTA
+    vevents  = VOTES_EVENTS
+    version  = _PAGE_VERSION
 
     # use relative path here so link works on both main and archive pages:
     archlink = f"{ARCHIVE_DIR}/index.html"
 
-    twitch   = TWITCH_URL
+    twitch   = ch.twitch_url
+    commands = ch.commands_href
 
     html = f"""<!DOCTYPE html>
 <html lang="en"><head>
@@ -191,26 +1387,97 @@ def write_vote_file():
       document.documentElement.style.setProperty('--bgurl','url('+bg+')');
       document.documentElement.style.setProperty('--accent-color',accent);
       document.documentElement.style.setProperty('--game-color',gameColor);
-      updateVotes(); setInterval(updateVotes,2000);
+      var list = document.getElementById('games-list');
+      Array.prototype.forEach.call(list.querySelectorAll('.game[data-key]'), function(el) {{
+        el.votes = +el.dataset.votes; el.order = +el.dataset.order; FEED.cards[el.dataset.key] = el;
+      }});
+      updateVotes(); startLive();
+      setInterval(function() {{ if (!FEED.live) updateVotes(); }}, 2000);
     }});
+    var FEED = {{version: {version}, cards: {{}}}};
+    async function getJSON(url) {{
+      var res = await fetch(url);
+      if (!res.ok) throw new Error(url + ': ' + res.status);
+      return res.json();
+    }}
+    function fillCard(el, g) {{
+      var lbl = g.votes===1 ? 'vote' : 'votes';
+      el.innerHTML = '<div class="votes"></div><div class="game-name"></div><div class="suggester"></div>';
+      el.children[0].textContent = g.votes+' '+lbl;
+      el.children[1].textContent = g.name;
+      el.children[2].textContent = 'Suggested by: '+g.user+' at '+g.time;
+      if (g.url) {{
+        var link = document.createElement('div'), a = document.createElement('a');
+        link.className = 'store-link'; a.href = g.url; a.target = '_blank'; a.textContent = 'View on Store';
+        link.appendChild(a); el.appendChild(link);
+      }}
+    }}
+    function applyDelta(d) {{
+      if (d.reset) {{
+        Object.keys(FEED.cards).forEach(function(k) {{ FEED.cards[k].remove(); }});
+        FEED.cards = {{}};
+      }}
+      (d.del || []).forEach(function(k) {{
+        if (FEED.cards[k]) {{ FEED.cards[k].remove(); delete FEED.cards[k]; }}
+      }});
+      (d.set || []).forEach(function(g) {{
+        var el = FEED.cards[g.key];
+        if (!el) {{
+          el = FEED.cards[g.key] = document.createElement('div');
+          el.className = 'game'; el.dataset.key = g.key;
+        }}
+        el.votes = g.votes; el.order = g.order;
+        fillCard(el, g);
+      }});
+    }}
+    function placeCards() {{
+      // move only the cards that are out of place
+      var list = document.getElementById('games-list'), at = list.firstElementChild;
+      Object.keys(FEED.cards).map(function(k) {{ return FEED.cards[k]; }})
+        .sort(function(a, b) {{ return (b.votes - a.votes) || (a.order - b.order); }})
+        .forEach(function(el) {{
+          if (el === at) at = at.nextElementSibling; else list.insertBefore(el, at);
+        }});
+    }}
+    async function loadSnapshot(version) {{
+      var snap = await getJSON('{vjson}?v=' + version);
+      var games = Array.isArray(snap) ? snap : snap.games;
+      // snapshots from before the order field: the array is already ranked
+      applyDelta({{reset: true, set: games.map(function(g, i) {{ if (g.order === undefined) g.order = i; return g; }})}});
+      FEED.version = snap.version || version;
+    }}
     async function updateVotes() {{
       try {{
-        var res = await fetch('{vjson}?cb=' + Date.now());
-        var games = await res.json();
-        document.getElementById('games-list').innerHTML = games.map(function(g) {{
-          var lbl = g.votes===1 ? 'vote' : 'votes';
-          var link = g.url
-            ? '<div class="store-link"><a href="'+g.url+'" target="_blank">View on Store</a></div>'
-            : '';
-          return '<div class="game">'
-               +  '<div class="votes">'+g.votes+' '+lbl+'</div>'
-               +  '<div class="game-name">'+g.name+'</div>'
-               +  '<div class="suggester">Suggested by: '+g.user+' at '+g.time+'</div>'
-               +  link
-               + '</div>';
-        }}).join('');  
+        var head = await getJSON('{vversion}?cb=' + Date.now());
+        if (head.version === FEED.version) return;
+        if (head.version < FEED.version || head.oldest > FEED.version + 1) {{
+          await loadSnapshot(head.version);
+        }} else {{
+          var log = await getJSON('{vdelta}?v=' + head.version);
+          log.deltas.forEach(function(d) {{ if (d.seq > FEED.version) applyDelta(d); }});
+          FEED.version = log.version;
+        }}
+        placeCards();
       }} catch(e) {{ console.error(e); }}
     }}
+    function startLive() {{
+      // only the bot's own web server has this stream; elsewhere it fails once and we keep polling
+      if (!window.EventSource) return;
+      var es = new EventSource('{vevents}?v=' + FEED.version);
+      es.onopen = function() {{ FEED.live = true; }};
+      es.onerror = function() {{
+        if (!FEED.live) es.close();
+        FEED.live = false;
+      }};
+      es.onmessage = function(e) {{
+        var d = JSON.parse(e.data);
+        if (d.reset || d.since <= FEED.version && d.seq > FEED.version) {{
+          applyDelta(d); FEED.version = d.seq; placeCards();
+        }} else if (d.seq > FEED.version) {{
+          updateVotes();
+        }}
+      }};
+    }}
   </script>
 </head><body>
   <div class="container">
@@ -218,7 +1485,7 @@ def write_vote_file():
     <div class="links">
         <a href="{twitch}" target="_blank">🎥 Watch Live on Twitch</a>
         <a class="link" href="{archlink}">📂 View Archives</a>
-        <a class="link" href="commands.html">📜 View Commands</a>
+        <a class="link" href="{commands}">📜 View Commands</a>
     </div>
     <div id="games-list">
       {games_html}
@@ -226,7 +1493,7 @@ def write_vote_file():
     <script>
       var host = window.location.hostname;
       var iframe = document.createElement('iframe');
-      iframe.src  = 'https://player.twitch.tv/?channel=brucecooper&parent=' + host;
+      iframe.src  = 'https://player.twitch.tv/?channel={ch.name}&parent=' + host;
       iframe.style.width  = '100%';
       iframe.style.height = '300px';
       iframe.style.border = 'none';
@@ -240,268 +1507,1904 @@ def write_vote_file():
   </div>
 </body></html>"""
 
-    with open(VOTE_FILE, "w", encoding="utf-8") as f:
-        f.write(html)
-    push_to_github()
+    head, rest    = html.split(_PAGE_VERSION)
+    mid, tail     = rest.split(_PAGE_GAMES)
+    ch.page_shell = (head, mid, tail)
+    return ch.page_shell
+
+def render_vote_files(ch):
+    """Current text of the channel's published files, by file name."""
+    files = render_votes_json(ch)
+    head, mid, tail = ch.page_shell or compile_vote_page(ch)
+    files[VOTE_FILE] = "".join((head, str(ch.feed.version), mid, render_game_cards(ch), tail))
+    return files
+
+@timed("render")
+def write_vote_file(ch):
+    """Render votes.json/index.html; returns True if any file changed."""
+    ch.feed.record(ch.leaderboard, publish=True)
+    changed = False
+    for name, text in render_vote_files(ch).items():
+        changed |= write_atomic(os.path.join(ch.out_dir, name), text)
+    return changed
+
+
+# ====== EVENT LOG ======
+LOG_FIELDS = {                               # op -> what follows [op, seq] in a log line
+    "vote":    ("key", "name", "url", "user", "time", "week", "day"),
+    "unvote":  ("key", "user", "forget"),
+    "rename":  ("key", "to", "name", "url"),
+    "url":     ("key", "name", "url"),       # logs from before "rename"
+    "clear":   (),
+    "archive": ("week",),
+}
+_row_op, _row_seq = operator.itemgetter(0), operator.itemgetter(1)
+
+def log_row(ev):
+    """An event as its log line: [op, seq, *LOG_FIELDS[op]]. Arrays decode
+    about twice as fast as objects, and replay is mostly decoding."""
+    return [ev["op"], ev["seq"], *map(ev.get, LOG_FIELDS[ev["op"]])]
+
+class VoteLog:
+    """Write-ahead log of every vote-state mutation, for crash recovery.
+
+    Events are JSON arrays, one per line (log_row()), flushed to the OS as
+    they are appended. The disk work is done by a worker thread of the
+    log's own, in order, so the event loop never waits on it: run() queues
+    an fsync every WAL_SYNC_EVERY events or once a second, and a snapshot
+    of the full state once WAL_SNAPSHOT_EVERY events, and a
+    WAL_SNAPSHOT_RATIO share of the votes held, have been logged since the
+    last. Spacing snapshots by the size of the state keeps their total
+    cost linear over a week, and a restart replays no more than that
+    share of events on top of the snapshot.
+
+    A snapshot switches the log to a fresh file first and captures the
+    state on the loop; the worker encodes and fsyncs it, then drops the
+    old log, so a crash at any point leaves every event in a snapshot or a
+    log. A weekly archive rotates the log to votes-<week>.log the same way.
+    """
+    def __init__(self, channel, directory=STATE_DIR):
+        self.channel       = channel
+        self.directory     = directory
+        self.path          = os.path.join(directory, "votes.log")
+        self.prev_path     = os.path.join(directory, "votes.log.prev")
+        self.snapshot_path = os.path.join(directory, "votes.snapshot.json")
+        self.seq           = 0        # seq of the last event appended
+        self.since_snapshot = 0
+        self._f            = None
+        self._unsynced     = 0
+        self._wake         = asyncio.Event()  # set when WAL_SYNC_EVERY events wait
+        self._disk         = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wal")
+        self._queued       = None     # future of the last job given to _disk
+
+    # --- recovery ---
+    def replay(self):
+        """Rebuild the vote state from the snapshot and logs; returns events replayed.
+
+        The cyclic GC is paused meanwhile: replay allocates a few objects per
+        vote, and every collection it would trigger rescans those already kept.
+        """
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._replay()
+        finally:
+            if was_enabled:
+                gc.enable()
+
+    def _replay(self):
+        reset_votes(self.channel)
+        snap_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snap = json.load(f)
+            restore_state(self.channel, snap)
+            snap_seq = self.seq = snap["seq"]
+        replay = BulkReplay(self.channel)
+        for path in (self.prev_path, self.path):
+            if not os.path.exists(path):
+                continue
+            for rows in self._read(path):
+                if rows and rows[0][1] <= snap_seq:
+                    rows = rows[bisect.bisect_right(rows, snap_seq, key=_row_seq):]
+                replay.add(rows)
+        replay.finish()
+        self.seq = replay.seq or self.seq
+        self.since_snapshot = replay.count
+        return replay.count
+
+    @staticmethod
+    def _read(path, batch=WAL_REPLAY_BATCH):
+        """Rows in path, a list per batch of whole lines. Each batch is parsed
+        as one JSON array, which keeps the per-line work inside the C decoder."""
+        with open(path, encoding="utf-8") as f:
+            rest = ""
+            while True:
+                chunk = f.read(batch)
+                text = rest + chunk
+                end = text.rfind("\n") + 1 if chunk else len(text)   # at EOF, a torn last line too
+                text, rest = text[:end], text[end:]
+                if not text:
+                    if chunk:
+                        continue
+                    return
+                torn = False
+                try:
+                    rows = json.loads("[" + text.rstrip("\n").replace("\n", ",") + "]")
+                except ValueError:
+                    # only a crash mid-append leaves a bad line, and only last
+                    rows, torn = [], True
+                    for line in text.splitlines():
+                        try:
+                            rows.append(json.loads(line))
+                        except ValueError:
+                            break
+                if any(map(isinstance, rows, itertools.repeat(dict))):   # logs from before log_row()
+                    rows = [log_row(r) if isinstance(r, dict) else r for r in rows]
+                yield rows
+                if torn:
+                    return
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        count = self.replay()
+        self._trim_torn_tail(self.path)
+        self._f = open(self.path, "a", encoding="utf-8")
+        if os.path.exists(self.prev_path):
+            # the last run died between switching logs and its snapshot:
+            # cover prev now, before the next switch could overwrite it
+            self._write_snapshot(capture_state(self.channel, self.seq), None, self.prev_path, None)
+            self.since_snapshot = 0
+        return count
+
+    @staticmethod
+    def _trim_torn_tail(path):
+        """Cut a half-written last line so new events start on a fresh line."""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            tail = f.seek(max(0, size - READ_LIMIT))
+            data = f.read()
+            if data.endswith(b"\n") or not data:
+                return
+            f.truncate(tail + data.rfind(b"\n") + 1)
+
+    # --- writing ---
+    def append(self, ev):
+        self.seq += 1
+        ev["seq"] = self.seq
+        if self._f is None:
+            return
+        self._f.write(json.dumps(log_row(ev), separators=(",", ":")) + "\n")
+        self._f.flush()
+        self._unsynced += 1
+        self.since_snapshot += 1
+        if self._unsynced >= WAL_SYNC_EVERY:
+            self._wake.set()
+
+    def _submit(self, fn, *args):
+        self._queued = self._disk.submit(fn, *args)
+        return self._queued
+
+    @staticmethod
+    def _fsync_fd(fd):
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def sync(self):
+        """Queue an fsync of what has been appended; returns its future, or
+        None if there is nothing to sync. The worker syncs a duplicate of
+        the descriptor, so switching files meanwhile is safe."""
+        if self._f is None or not self._unsynced:
+            return None
+        self._unsynced = 0
+        return self._submit(self._fsync_fd, os.dup(self._f.fileno()))
+
+    def close(self):
+        """Stop logging: sync what is left and wait for the worker to finish."""
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
+        if self._queued is not None:
+            self._queued.result()
+
+    def _switch_file(self, old_dest):
+        """Move the live log to old_dest and start an empty one. Returns a
+        duplicate descriptor of the old file, for the worker to fsync."""
+        fd = None
+        if self._f is not None:
+            fd = os.dup(self._f.fileno())
+            self._f.close()
+        if os.path.exists(self.path):
+            os.replace(self.path, old_dest)
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        return fd
+
+    def _write_snapshot(self, state, fd, covered, keep_as):
+        """Worker side of a snapshot: make the switched-out log durable, then
+        the snapshot, then drop the log it covers (or keep it as keep_as)."""
+        if fd is not None:
+            self._fsync_fd(fd)
+        write_state(self.snapshot_path, state)
+        if covered is not None and os.path.exists(covered):
+            if keep_as:
+                os.replace(covered, keep_as)
+            else:
+                os.remove(covered)
+
+    def _take_snapshot(self, keep_as=None):
+        if os.path.exists(self.prev_path):
+            # an earlier snapshot still has to cover prev: leave the live log
+            # where it is, this snapshot covers it too and the next one switches
+            fd = covered = keep_as = None
+        else:
+            fd, covered = self._switch_file(self.prev_path), self.prev_path
+        state = capture_state(self.channel, self.seq)
+        self.since_snapshot = 0
+        return self._submit(self._write_snapshot, state, fd, covered, keep_as)
+
+    def snapshot(self):
+        """Persist the full state and drop the log entries it covers; returns
+        the worker's future. Only the capture happens on the caller's thread."""
+        return self._take_snapshot()
+
+    def rotate(self, week_id):
+        """Weekly archive boundary: snapshot the (now empty) state, and keep
+        last week's log aside as votes-<week>.log once it is covered."""
+        return self._take_snapshot(os.path.join(self.directory, f"votes-{week_id}.log"))
+
+    def snapshot_due(self):
+        return self.since_snapshot >= max(WAL_SNAPSHOT_EVERY, len(self.channel.history) * WAL_SNAPSHOT_RATIO)
+
+    async def run(self):
+        """Background fsyncs and periodic snapshots, one job at a time."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), WAL_SYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self.sync()
+            if self.snapshot_due():
+                self.snapshot()
+            if self._queued is not None:
+                await asyncio.wrap_future(self._queued)
+
+class _LimitOps:
+    """Stands in for a channel's VoteLimiter while BulkReplay applies an
+    event other than a vote, keeping its forget() and rekey() calls for
+    VoteLimiter.count_all()."""
+    def __init__(self, edits, cut):
+        self.edits, self.cut = edits, cut
+
+    def forget(self, user, key):
+        self.edits.setdefault(user, []).append((self.cut, "forget", key, None))
+
+    def rekey(self, users, key, new):
+        for user in users:
+            self.edits.setdefault(user, []).append((self.cut, "rekey", key, new))
+
+class BulkReplay:
+    """apply_event() for a whole log, for startup replay.
+
+    Nearly every event is a vote, and applying them one at a time costs
+    several times the JSON decoding. Votes are taken in as columns instead,
+    and each game's vote indexes are listed, so its count at any point is
+    a bisection. A game's entry is only brought up to date when another
+    event touches it, and the history only when an event reads it; both
+    are caught up at the end. The other events, a few percent, go through
+    apply_event() as they are. The limiter is filled last, from the
+    history's per-user stacks, by VoteLimiter.count_all().
+    """
+    def __init__(self, ch):
+        self.ch    = ch
+        self.seq   = 0                       # of the last row added
+        self.count = 0                       # rows added
+        self._strings = {}                   # one copy of each game key
+        self._clear()
+        self.known.update(e.key for e in ch.leaderboard)
+
+    def _clear(self):
+        self.keys, self.users = [], []       # every vote
+        self.done    = 0                     # how many of them are on the history
+        self.times, self.days, self.weeks = Runs(), Runs(), Runs()
+        self.at      = {}                    # key -> indexes of its votes
+        self.base    = self.ch.history.cast  # history index of the first
+        self.counted = {}                    # key -> how many of those its entries have had
+        self.known   = set()                 # keys with a leaderboard entry
+        self.due     = []                    # heap of (index, key): votes that make a new entry
+        self.edits   = {}                    # user -> limiter calls, see count_all()
+
+    def add(self, rows):
+        """Apply a batch of log rows, oldest first."""
+        if not rows:
+            return
+        self.seq = rows[-1][1]
+        self.count += len(rows)
+        votes  = list(map("vote".__eq__, map(_row_op, rows)))
+        others = list(itertools.compress(itertools.count(), map(operator.not_, votes)))
+        for n in range(len(others) - 1, -1, -1):
+            if rows[others[n]][0] in ("clear", "archive"):   # nothing before it counts
+                reset_votes(self.ch)
+                self._clear()
+                cut = others[n] + 1
+                rows, votes, others = rows[cut:], votes[cut:], [i - cut for i in others[n + 1:]]
+                break
+        base, batch = len(self.keys), list(itertools.compress(rows, votes)) if others else rows
+        if batch:
+            intern = self._strings.setdefault
+            _, _, keys, names, urls, users, times, weeks, days = zip(*batch)
+            keys = list(map(intern, keys, keys))   # kept by the history
+            at = self.at
+            for key in set(keys).difference(at):
+                at[key] = []
+            deque(map(list.append, map(at.__getitem__, keys), range(base, base + len(keys))), maxlen=0)
+            for key in set(keys).difference(self.known):
+                heapq.heappush(self.due, (at[key][bisect.bisect_left(at[key], base)], key))
+            self.keys += keys; self.users += users
+            self.times.extend(times); self.days.extend(days); self.weeks.extend(weeks)
+            self._names = base, names, urls
+        for n, i in enumerate(others):
+            self._other(rows[i], base + i - n)   # with the votes before it
+        self._make(len(self.keys))
+
+    def finish(self):
+        """Settle what add() left pending. Call once, after the last add()."""
+        self._extend(len(self.keys))
+        for key in self.known:
+            self._settle(key, len(self.keys))
+        votes = self.ch.history.votes_by_user(self.base)
+        self.ch.limiter.count_all(votes, self.keys, self.days, self.weeks, self.edits)
+        self._clear()
+
+    def _extend(self, cut):
+        """Put the votes before cut on the history."""
+        if cut > self.done:
+            self.ch.history.extend(self.keys[self.done:cut], self.users[self.done:cut])
+            self.done = cut
+
+    def _make(self, cut):
+        """Make the entries of games voted for before cut without one."""
+        ch, due = self.ch, self.due
+        while due and due[0][0] < cut:
+            j, key = heapq.heappop(due)
+            if key not in self.known:
+                base, names, urls = self._names
+                ch.leaderboard.add(key, names[j - base], urls[j - base], self.users[j])
+                ch.matcher.add(key)
+                self.known.add(key)
+
+    def _settle(self, key, cut):
+        """Put key's votes before cut on its entry."""
+        votes = self.at.get(key)
+        if votes:
+            p = bisect.bisect_left(votes, cut)
+            n = p - self.counted.get(key, 0)
+            if n > 0:
+                info = self.ch.leaderboard.increment(key, n)
+                info.user, info.time = self.users[votes[p - 1]], self.times[votes[p - 1]]
+            self.counted[key] = p
+
+    def _other(self, row, cut):
+        ch, op = self.ch, row[0]
+        ev = dict(zip(("op", "seq") + LOG_FIELDS[op], row))
+        touched = (ev["key"], ev["to"]) if op == "rename" else (ev["key"],)
+        self._make(cut)
+        for key in touched:
+            self._settle(key, cut)
+        if op == "unvote" or op == "rename" and ev["key"] != ev["to"]:   # the ones that read the history
+            self._extend(cut)
+        limiter, ch.limiter = ch.limiter, _LimitOps(self.edits, cut)
+        try:
+            apply_event(ch, ev)
+        finally:
+            ch.limiter = limiter
+        for key in touched:
+            if key in ch.leaderboard:
+                self.known.add(key)
+            elif key in self.known:          # gone; a later vote makes it again
+                self.known.discard(key)
+                votes = self.at.get(key, ())
+                p = bisect.bisect_left(votes, cut)
+                if p < len(votes):
+                    heapq.heappush(self.due, (votes[p], key))
+
+def capture_state(ch, seq):
+    """Freeze what a snapshot needs, quickly enough for the event loop: a
+    row per game, a copy of the limiter and VoteHistory.capture()."""
+    return {
+        "seq":     seq,
+        "games":   [[e.key, e.name, e.url, e.user, e.time, e.votes, e.order] for e in ch.leaderboard],
+        "limiter": ch.limiter.copy(),
+        "history": ch.history.capture(),
+    }
+
+def dump_state(state):
+    """A captured state as snapshot JSON data. The per-user and per-ballot
+    work happens here, in the log's worker thread."""
+    return dict(state, limiter=state["limiter"].dump(), history=VoteHistory.id_columns(*state["history"]()))
+
+def json_pieces(obj, size=WAL_SNAPSHOT_SLICE):
+    """json.dumps(obj) in pieces, long lists a slice at a time: one
+    json.dumps() call holds the GIL until it returns."""
+    if isinstance(obj, dict):
+        yield "{"
+        for i, (k, v) in enumerate(obj.items()):
+            yield ("," if i else "") + json.dumps(k) + ":"
+            yield from json_pieces(v, size)
+        yield "}"
+    elif isinstance(obj, list) and len(obj) > size:
+        yield "["
+        for i in range(0, len(obj), size):
+            yield ("," if i else "") + json.dumps(obj[i:i + size], separators=(",", ":"))[1:-1]
+        yield "]"
+    else:
+        yield json.dumps(obj, separators=(",", ":"))
+
+def write_state(path, state):
+    """Write a captured state to path via temp file + fsync + rename."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(json_pieces(dump_state(state)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def restore_state(ch, snap):
+    ch.leaderboard.restore(GameEntry.from_row(row) for row in snap["games"])
+    for e in ch.leaderboard:
+        ch.matcher.add(e.key)
+    if "limiter" in snap:
+        ch.limiter.load(snap["limiter"])
+    else:                                    # older snapshots: a row per chatter
+        ch.limiter.load_rows(snap["limits"])
+    ch.history.load(snap["history"])
 
 # ====== ARCHIVE & GITHUB UTILS ======
-def archive_votes():
-    os.makedirs(ARCHIVE_DIR, exist_ok=True)
-    now     = get_current_pst_datetime()
+class ArchiveStore:
+    """A channel's weekly archives: a metadata index plus per-week results.
+
+    The index (archives.json) maps week_id to {week_id, start, end,
+    total_votes, file}. It is loaded once, kept in memory with the week ids
+    in sorted order, and rewritten atomically on change. Each week's
+    results are stored as <week_id>.json (the ranked games) rather than a
+    copy of the page; archives/week.html renders them in the browser.
+    Weeks archived before that still point at their archive_<week>.html.
+    """
+    def __init__(self, directory, index_path):
+        self.directory  = directory
+        self.index_path = index_path
+        self._weeks     = None               # week_id -> entry
+        self._order     = []                 # week_ids, oldest first
+
+    def _load(self):
+        if self._weeks is not None:
+            return
+        self._weeks = {}
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        for e in data.values() if isinstance(data, dict) else data:
+            e = self._upgrade(e)
+            self._weeks[e["week_id"]] = e
+        self._order = sorted(self._weeks)
+
+    @staticmethod
+    def _upgrade(e):
+        """Entries from older bots: {week_id, start, end, total_votes, file}
+        or, before that, {week, file, time}."""
+        return {"week_id":     e.get("week_id") or e["week"],
+                "start":       e.get("start", ""),
+                "end":         e.get("end") or e.get("time", "")[:10],
+                "total_votes": e.get("total_votes"),
+                "file":        e.get("file")}
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.index_path, json.dumps({w: self._weeks[w] for w in self._order}, indent=2))
+
+    def __len__(self):
+        self._load()
+        return len(self._order)
+
+    def __contains__(self, week_id):
+        self._load()
+        return week_id in self._weeks
+
+    def get(self, week_id):
+        self._load()
+        return self._weeks.get(week_id)
+
+    def weeks(self):
+        """Week ids, oldest first."""
+        self._load()
+        return self._order
+
+    def position(self, week_id):
+        self._load()
+        return bisect.bisect_left(self._order, week_id)
+
+    def find(self, name):
+        """week_id for a week id or an archive file name, else None."""
+        self._load()
+        if name in self._weeks:
+            return name
+        stem = os.path.splitext(name)[0]
+        for w in (stem, stem[len("archive_"):]):
+            if w in self._weeks:
+                return w
+        return None
+
+    def path(self, week_id):
+        return os.path.join(self.directory, f"{week_id}.json")
+
+    def results(self, week_id):
+        """(entry, record) of an archived week, record being {games, voters}.
+        Old HTML archives are parsed for their games and have no voters;
+        record is None if the week or its file is missing."""
+        entry = self.get(week_id)
+        if entry is None:
+            return None, None
+        try:
+            if entry["file"]:
+                return entry, {"games": parse_archive_html(os.path.join(self.directory, entry["file"])),
+                               "voters": {}}
+            with open(self.path(week_id), encoding="utf-8") as f:
+                return entry, json.load(f)
+        except (OSError, ValueError):
+            return entry, None
+
+    def add(self, entry, games, voters):
+        """Store a week: its ranked games and the votes each chatter cast."""
+        self._load()
+        os.makedirs(self.directory, exist_ok=True)
+        week_id = entry["week_id"]
+        write_atomic(self.path(week_id), json.dumps(dict(entry, games=games, voters=voters), indent=1))
+        if week_id not in self._weeks:
+            bisect.insort(self._order, week_id)
+        self._weeks[week_id] = entry
+        self._save()
+
+    def remove(self, week_id):
+        self._load()
+        entry = self._weeks.pop(week_id, None)
+        if entry is None:
+            return None
+        self._order.remove(week_id)
+        for fn in (f"{week_id}.json", entry["file"]):
+            if fn:
+                remove_file(os.path.join(self.directory, fn))
+        self._save()
+        return entry
+
+    def clear(self):
+        self._weeks, self._order = {}, []
+        self._save()
+
+def archive_votes(ch, now=None):
+    now     = now or get_current_pst_datetime()
     week_id = now.strftime("%Y-W%U")
     start   = (now - datetime.timedelta(days=6)).strftime("%B %d, %Y")
     end     = now.strftime("%B %d, %Y")
-    fn      = f"archive_{week_id}.html"
-    path    = os.path.join(ARCHIVE_DIR, fn)
-    if os.path.exists(VOTE_FILE):
-        with open(VOTE_FILE,'r',encoding="utf-8") as src, open(path,'w',encoding="utf-8") as dst:
-            dst.write(src.read())
-    meta = []
-    if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE,'r',encoding="utf-8") as m:
-            meta = json.load(m)
-    total = sum(info["votes"] for info in game_suggestions.values())
-    if not any(e["week_id"]==week_id for e in meta):
-        meta.append({"week_id":week_id,"start":start,"end":end,"total_votes":total,"file":fn})
-        with open(METADATA_FILE,'w',encoding="utf-8") as m:
-            json.dump(meta,m,indent=2)
-    generate_archive_index()
-    push_to_github()
-
-def generate_archive_index():
-    if not os.path.exists(METADATA_FILE): return
-    with open(METADATA_FILE,'r',encoding="utf-8") as m:
-        meta = sorted(json.load(m), key=lambda e:e["week_id"], reverse=True)
-    back_main = "../index.html"
-    html2 = """<!DOCTYPE html><html><head><meta charset="UTF-8"><title>📂 Vote Archives</title>
-  <style>
+    total   = ch.leaderboard.total_votes
+    if week_id in ch.archives and not total:
+        # an empty board re-archived in the same week (manual, then the
+        # Saturday run) must not wipe what was saved before
+        return week_id
+    ch.archives.add({"week_id": week_id, "start": start, "end": end, "total_votes": total, "file": None},
+                    [info.as_dict() for info in ch.leaderboard],
+                    dict(Counter(b.user for b in ch.history)))
+    ch.stats.add_week(week_id)
+    generate_archive_index(ch, week_id)
+    return week_id
+
+def parse_archive_html(path):
+    """Ranked games from an archive page of an older bot (a copy of index.html)."""
+    from bs4 import BeautifulSoup
+    with open(path, encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    games = []
+    for card in soup.select(".game"):
+        name, votes = card.select_one(".game-name"), card.select_one(".votes")
+        if name is None or votes is None:
+            continue
+        name = name.get_text(strip=True)
+        by   = card.select_one(".suggester")
+        user = by.get_text(" ", strip=True).removeprefix("Suggested by:").split(" at ")[0].strip() if by else ""
+        link = card.select_one(".store-link a")
+        games.append({"key": name.lower(), "name": name,
+                      "votes": int("".join(c for c in votes.get_text() if c.isdigit()) or 0),
+                      "url": link.get("href") if link else None, "user": user})
+    return games
+
+ARCHIVE_STYLE = """<style>
     body{background:#0a0a0a;color:#c9d1d9;font-family:sans-serif;padding:20px}
     .links{margin-bottom:1rem}.links a{color:#888;text-decoration:none;margin-right:1rem}
     .links a:hover{text-decoration:underline;font-weight:bold}
     .week{margin-bottom:1rem;padding:0.5rem 0;border-bottom:1px solid #333}
+    .game{margin:0.6rem 0;padding:0.5rem 0.8rem;border-left:3px solid #00eaff;background:#111}
+    .votes{color:#00eaff;font-weight:bold}.suggester{opacity:0.7;font-size:0.9em}
     a{color:#888;text-decoration:none}a:hover{text-decoration:underline}
-  </style></head><body>"""
-    html2 += f"<div class='links'><a href='{back_main}'>← Back to Suggestions</a><a href='{TWITCH_URL}' target='_blank'>🎥 Watch on Twitch</a></div>"
-    html2 += "<h1>📂 Vote Archives</h1>"
-    for e in meta:
-        html2 += (
-            "<div class='week'>"
-            f"<strong>Week {e['week_id']}</strong><br>"
-            f"{e['start']} – {e['end']}<br>"
-            f"Total Votes: {e['total_votes']}<br>"
-            f"<a href='{e['file']}'>View Details</a>"
-            "</div>"
-        )
-    html2 += "</body></html>"
-    with open(os.path.join(ARCHIVE_DIR, "index.html"), 'w', encoding="utf-8") as out:
-        out.write(html2)
-    push_to_github()
-
-def push_to_github():
-    to_add = [VOTES_JSON, VOTE_FILE]
-    if os.path.isdir(ARCHIVE_DIR):
-        for fn in os.listdir(ARCHIVE_DIR):
-            if fn.endswith(".html") or fn.endswith(".json"):
-                to_add.append(os.path.join(ARCHIVE_DIR, fn))
+  </style>"""
+
+ARCHIVE_VIEWER = """<!DOCTYPE html><html><head><meta charset="UTF-8"><title>📂 Archived Week</title>
+  """ + ARCHIVE_STYLE + """
+  <script>
+    document.addEventListener('DOMContentLoaded', async function() {
+      var week = new URLSearchParams(location.search).get('w') || '';
+      var out = document.getElementById('games');
+      function add(parent, tag, cls, text) {
+        var el = document.createElement(tag); el.className = cls; el.textContent = text;
+        parent.appendChild(el); return el;
+      }
+      try {
+        if (!/^[\\w-]+$/.test(week)) throw new Error('no week given');
+        var res = await fetch(week + '.json');
+        if (!res.ok) throw new Error(res.status);
+        var data = await res.json();
+        document.title = '📂 Week ' + data.week_id;
+        document.getElementById('title').textContent = '📂 Week ' + data.week_id;
+        document.getElementById('range').textContent =
+          data.start + ' – ' + data.end + ' · Total Votes: ' + data.total_votes;
+        data.games.forEach(function(g) {
+          var card = add(out, 'div', 'game', '');
+          add(card, 'div', 'votes', g.votes + (g.votes === 1 ? ' vote' : ' votes'));
+          add(card, 'div', 'game-name', g.name);
+          add(card, 'div', 'suggester', 'Suggested by: ' + g.user + ' at ' + g.time);
+          if (g.url) {
+            var a = add(add(card, 'div', 'store-link', ''), 'a', '', 'View on Store');
+            a.href = g.url; a.target = '_blank';
+          }
+        });
+      } catch (e) {
+        add(out, 'p', '', 'Archive not found.');
+      }
+    });
+  </script></head><body>
+  <div class='links'><a href='index.html'>← All Archives</a><a href='../index.html'>Current Suggestions</a></div>
+  <h1 id='title'>📂 Archived Week</h1><p id='range'></p><div id='games'></div>
+</body></html>"""
+
+def archive_page_name(page, last):
+    return "index.html" if page == last else f"page-{page + 1}.html"
+
+def generate_archive_index(ch, week_id=None):
+    """Write the archive index, ARCHIVE_PAGE_SIZE weeks per page.
+
+    Pages are cut oldest first, and the newest page (always index.html)
+    also takes the remainder, so it shows between one and two pages' worth
+    of weeks. A new week then only rewrites index.html, and older pages
+    keep their contents and names. When the number of pages changes every
+    page is rewritten, since their newer/older links move. week_id is the
+    first week that changed; None rewrites every page.
+    """
+    store = ch.archives
+    weeks = store.weeks()
+    size  = ARCHIVE_PAGE_SIZE
+    os.makedirs(ch.archive_dir, exist_ok=True)
+    write_atomic(os.path.join(ch.archive_dir, "week.html"), ARCHIVE_VIEWER)
+    last  = max(0, len(weeks) // size - 1)
+    grown = last and not os.path.exists(os.path.join(ch.archive_dir, archive_page_name(last - 1, last)))
+    stale = os.path.join(ch.archive_dir, f"page-{last + 1}.html")   # left over if pages were dropped
+    if week_id is None or grown or os.path.exists(stale):
+        first = 0
+    else:
+        first = min(store.position(week_id) // size, last)
+    for page in range(first, last + 1):
+        nav = ["<a href='../index.html'>← Back to Suggestions</a>",
+               f"<a href='{ch.twitch_url}' target='_blank'>🎥 Watch on Twitch</a>"]
+        if page < last:
+            nav.append(f"<a href='{archive_page_name(page + 1, last)}'>Newer weeks →</a>")
+        if page > 0:
+            nav.append(f"<a href='{archive_page_name(page - 1, last)}'>← Older weeks</a>")
+        out = [f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><title>📂 Vote Archives</title>
+  {ARCHIVE_STYLE}</head><body>""",
+               f"<div class='links'>{''.join(nav)}</div>",
+               "<h1>📂 Vote Archives</h1>"]
+        end = len(weeks) if page == last else (page + 1) * size
+        for w in reversed(weeks[page * size:end]):
+            e     = store.get(w)
+            dates = f"{e['start']} – {e['end']}" if e["start"] else e["end"]
+            total = "?" if e["total_votes"] is None else e["total_votes"]
+            href  = e["file"] or f"week.html?w={w}"
+            out.append(
+                "<div class='week'>"
+                f"<strong>Week {w}</strong><br>"
+                f"{dates}<br>"
+                f"Total Votes: {total}<br>"
+                f"<a href='{href}'>View Details</a>"
+                "</div>"
+            )
+        out.append("</body></html>")
+        write_atomic(os.path.join(ch.archive_dir, archive_page_name(page, last)), "".join(out))
+    remove_file(stale)
+
+git_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="git")   # one git at a time
+
+def push_to_github(ch):
+    to_add = [ch.votes_json, ch.votes_delta, ch.votes_version, ch.vote_file]
     try:
         subprocess.run(["git","add"] + to_add, check=True)
+        if os.path.isdir(ch.archive_dir):
+            # -A: deleted archives are staged too, without listing thousands of weeks
+            subprocess.run(["git","add","-A","--",ch.archive_dir], check=True)
         if subprocess.run(["git","diff-index","--quiet","HEAD"], check=False).returncode != 0:
-            subprocess.run(["git","commit","-m","Auto update vote page"], check=True)
+            subprocess.run(["git","commit","-m",f"Auto update vote page ({ch.name})"], check=True)
             subprocess.run(["git","push"], check=True)
     except subprocess.CalledProcessError:
         pass
 
-def main():
-    global last_message_time, last_archive_date, pending_clear, pending_delete_fname, pending_delete_all
-    sock = socket.socket()
-    try:
-        sock.connect(("irc.chat.twitch.tv", 6667))
-    except Exception as e:
-        print("Connection error:", e)
-        return
-    sock.send(f"PASS {OAUTH_TOKEN}\r\n".encode())
-    sock.send(f"NICK {BOT_USERNAME}\r\n".encode())
-    sock.send(f"JOIN {CHANNEL}\r\n".encode())
-    print(f"✅ Connected to {CHANNEL}")
+# ====== VOTE STATS ======
+class VoteStats:
+    """Totals across a channel's archived weeks, for !top, !history and !stats.
 
+    Every archived week is flattened into columns of small ints: one row
+    per game per week (week, game, votes) and one per chatter per week
+    (week, voter, votes). Games are identified across weeks by
+    normalize_game_name(), so 'The Witcher III' and 'witcher 3' add up.
+    The answers the commands need (each game's totals, best and latest
+    week, the all-time ranking, the recent top voters) are rolled up from
+    the columns whenever a week is added or removed, so a chat query is a
+    lookup. Everything is read from the archives once: by warm_up() in a
+    worker thread, or on first use if a query gets there first. The lock
+    makes a query or an archive change wait for a load in progress.
+    """
+    def __init__(self, archives):
+        self.archives = archives
+        self._lock    = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._loaded    = False
+        self._week_ids  = {}                 # week_id -> week number
+        self._weeks     = []                 # week number -> week_id
+        self._game_ids  = {}                 # normalized name -> game id
+        self._names     = []                 # game id -> name as first archived
+        self._user_ids  = {}                 # chatter -> user id
+        self._users     = []                 # user id -> chatter
+        self._matcher   = GameMatcher()      # over normalized names
+        self._games     = tuple(array("I") for _ in range(3))   # week, game, votes
+        self._voters    = tuple(array("I") for _ in range(3))   # week, voter, votes
+        self._rollup    = None
+
+    def _intern(self, ids, names, name):
+        i = ids.get(name)
+        if i is None:
+            name = sys.intern(name)
+            i = ids[name] = len(names)
+            names.append(name)
+        return i
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for week_id in list(self.archives.weeks()):
+                self._read_week(week_id)
+            self._roll_up()
+            self._loaded = True
+
+    def _read_week(self, week_id):
+        _, record = self.archives.results(week_id)
+        if record is None:
+            return
+        w = self._intern(self._week_ids, self._weeks, week_id)
+        week, game, votes = self._games
+        for g in record.get("games") or ():
+            name = g.get("name") or g.get("key") or ""
+            key  = normalize_game_name(name) or name.lower()
+            gid  = self._game_ids.get(key)
+            if gid is None:
+                gid = self._intern(self._game_ids, self._names, key)
+                self._names[gid] = name
+                self._matcher.add(key)
+            week.append(w); game.append(gid); votes.append(g.get("votes") or 0)
+        week, voter, votes = self._voters
+        for user, n in (record.get("voters") or {}).items():
+            week.append(w); voter.append(self._intern(self._user_ids, self._users, user)); votes.append(n)
+
+    def _drop_week(self, week_id):
+        w = self._week_ids.get(week_id)
+        if w is None:
+            return
+        for cols in (self._games, self._voters):
+            keep = [i for i, x in enumerate(cols[0]) if x != w]
+            for col in cols:
+                col[:] = array("I", map(col.__getitem__, keep))
+
+    def _roll_up(self):
+        n = len(self._names)
+        week, game, votes = self._games
+        label  = self._weeks
+        totals = array("I", bytes(4 * n))
+        weeks  = array("I", bytes(4 * n))
+        best   = array("i", [-1]) * n        # row of each game's best week
+        first  = array("i", [-1]) * n        # ...and of its first and latest week
+        last   = array("i", [-1]) * n
+        for i, (w, g, v) in enumerate(zip(week, game, votes)):
+            totals[g] += v
+            weeks[g]  += 1
+            if best[g] < 0 or v > votes[best[g]]:
+                best[g] = i
+            if first[g] < 0 or label[w] < label[week[first[g]]]:
+                first[g] = i
+            if last[g] < 0 or label[w] > label[week[last[g]]]:
+                last[g] = i
+        ranking = sorted((g for g in range(n) if weeks[g]), key=lambda g: (-totals[g], self._names[g]))
+
+        recent = {self._week_ids[w] for w in self.archives.weeks()[-STATS_RECENT_WEEKS:] if w in self._week_ids}
+        per_user = defaultdict(int)
+        for w, u, v in zip(*self._voters):
+            if w in recent:
+                per_user[u] += v
+        voters = sorted(per_user, key=lambda u: (-per_user[u], self._users[u]))[:STATS_TOP]
+
+        self._rollup = {
+            "totals": totals, "weeks": weeks, "best": best, "first": first, "last": last,
+            "top":    [(self._names[g], totals[g], weeks[g]) for g in ranking[:STATS_TOP]],
+            "voters": [(self._users[u], per_user[u]) for u in voters],
+            "summary": {"weeks": len(set(week)), "votes": sum(votes), "games": len(ranking),
+                        "voters": len(set(self._voters[1])), "recent_weeks": len(recent)},
+        }
+
+    def add_week(self, week_id):
+        """A week was archived (or re-archived)."""
+        with self._lock:
+            if self._loaded:
+                self._drop_week(week_id)
+                self._read_week(week_id)
+                self._roll_up()
+
+    def remove_week(self, week_id):
+        with self._lock:
+            if self._loaded:
+                self._drop_week(week_id)
+                self._roll_up()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def top(self):
+        """[(name, votes, weeks)] of the STATS_TOP games with the most votes."""
+        self.load()
+        return self._rollup["top"]
+
+    def top_voters(self):
+        """[(chatter, votes)] over the last STATS_RECENT_WEEKS archived weeks."""
+        self.load()
+        return self._rollup["voters"]
+
+    def summary(self):
+        self.load()
+        return self._rollup["summary"]
+
+    def history(self, query):
+        """One game's record across weeks, or None if it was never archived."""
+        self.load()
+        key = self._matcher.match(normalize_game_name(query) or query)
+        gid = self._game_ids.get(key) if key is not None else None
+        r   = self._rollup
+        if gid is None or not r["weeks"][gid]:
+            return None
+        week, _, votes = self._games
+        best, first, last = r["best"][gid], r["first"][gid], r["last"][gid]
+        return {"name": self._names[gid], "votes": r["totals"][gid], "weeks": r["weeks"][gid],
+                "best_votes": votes[best], "best_week": self._weeks[week[best]],
+                "first_week": self._weeks[week[first]], "last_week": self._weeks[week[last]]}
+
+# ====== CHAT OUTBOX ======
+class TokenBucket:
+    """Token bucket sized so no sliding window of `per` seconds exceeds `limit`.
+
+    Half the limit is available as an instant burst, the other half trickles
+    back in over the window: burst + refill never adds up to more than limit.
+    """
+    def __init__(self, limit, per):
+        self.capacity = max(1, limit // 2)
+        self.rate     = (limit - self.capacity) / per
+        self.tokens   = float(self.capacity)
+        self.stamp    = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp  = now
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is ready now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+class ChatOutbox:
+    """Rate-limited queue of chat replies.
+
+    say() and confirm() never block. When replies back up, queued vote
+    confirmations for the same channel are merged into one
+    "✅ counted: alice→Hades, …" line so a raid does not burn the whole
+    Twitch allowance on acknowledgements. The allowance is per account, so
+    one outbox serves every joined channel.
+    """
+    def __init__(self, limit=CHAT_LIMIT, per=CHAT_WINDOW, maxsize=OUTBOX_MAX):
+        self.bucket   = TokenBucket(limit, per)
+        self.maxsize  = maxsize
+        self.sent     = 0      # PRIVMSGs written to the socket
+        self.merged   = 0      # confirmations folded into a combined line
+        self.dropped  = 0      # replies discarded because the queue was full
+        self._queue   = deque()   # (kind, channel, payload, monotonic time queued), kind being
+                                  # "say" with a text or "confirm" with (user, game)
+        self._ready   = None
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def say(self, channel, message):
+        self._put(("say", channel, message, time.monotonic()))
+
+    def confirm(self, channel, user, game):
+        self._put(("confirm", channel, (user, game), time.monotonic()))
+
+    def _put(self, item):
+        if len(self._queue) >= self.maxsize:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(item)
+        if self._ready is not None:
+            self._ready.set()
+
+    def _next_message(self):
+        """(channel, text) of the next PRIVMSG to send."""
+        kind, channel, payload, queued = self._queue.popleft()
+        metrics.observe("outbox_wait", time.monotonic() - queued)
+        if kind == "say":
+            return channel, payload
+        user, game = payload
+        if not any(k == "confirm" and c == channel for k, c, _, _ in self._queue):
+            return channel, f"@{user} ✅ Vote for '{game}' counted!"
+        parts, rest = [f"{user}→{game}"], deque()
+        size = len("✅ counted: ") + len(parts[0])
+        while self._queue:
+            item = self._queue.popleft()
+            if item[0] == "confirm" and item[1] == channel:
+                part = "{}→{}".format(*item[2])
+                if size + 2 + len(part) <= CHAT_MAX_LEN:
+                    parts.append(part); size += 2 + len(part)
+                    self.merged += 1
+                    continue
+            rest.append(item)
+        self._queue = rest
+        self.merged += 1
+        return channel, "✅ counted: " + ", ".join(parts)
+
+    async def run(self, writer):
+        self._ready = asyncio.Event()
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            delay = self.bucket.delay()
+            if delay:
+                # let replies pile up so they can be merged into one line
+                await asyncio.sleep(delay)
+            self.bucket.take()
+            channel, text = self._next_message()
+            writer.write(f"PRIVMSG {channel} :{text}\r\n".encode())
+            self.sent += 1
+            await writer.drain()
+
+outbox = ChatOutbox()
+
+# ====== PUBLISHER ======
+class Publisher:
+    """Event-loop task that renders a channel's vote page and pushes it to GitHub.
+
+    Handlers only call mark_dirty(); any burst of votes inside one
+    PUBLISH_INTERVAL window ends up as a single render + a single commit.
+    flush() skips the window (archive, shutdown). The git push runs on
+    git_pool so it never holds up the IRC tasks, and channels take turns.
+    """
+    def __init__(self, channel, interval=PUBLISH_INTERVAL):
+        self.channel       = channel
+        self.interval      = interval
+        self.publish_count = 0
+        self._dirty        = False
+        self._force        = False
+        self._wakeup       = None
+        self._last_publish = 0.0
+
+    def mark_dirty(self):
+        self._dirty = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if live is not None:
+            live.notify(self.channel)
+
+    def flush(self):
+        """Publish as soon as the publisher task gets to run."""
+        self._force = True
+        self.mark_dirty()
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            if not self._dirty:
+                await self._wakeup.wait()
+            self._wakeup.clear()
+            delay = self._last_publish + self.interval - time.monotonic()
+            if delay > 0 and not self._force:
+                # more votes may land while we wait; they ride along
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.publish()
+
+    async def publish(self):
+        forced = self._force                 # archive files may have changed too
+        self._dirty = self._force = False
+        try:
+            if write_vote_file(self.channel) or forced:
+                t = time.perf_counter()
+                await asyncio.get_running_loop().run_in_executor(git_pool, push_to_github, self.channel)
+                metrics.observe("push", time.perf_counter() - t)
+        except Exception as e:
+            print(f"⚠️ Publish failed for {self.channel.irc}:", e)
+        self._last_publish = time.monotonic()
+        self.publish_count += 1
+
+    async def stop(self):
+        """Publish whatever is still pending (shutdown path)."""
+        if self._dirty:
+            await self.publish()
+
+# ====== ARCHIVE SCHEDULE ======
+def next_weekly(after, tz=PST, weekday=ARCHIVE_WEEKDAY, hour=ARCHIVE_HOUR):
+    """The first `weekday` at hour:00 local time strictly after `after`.
+
+    The date is stepped on the local calendar and localized afresh, so the
+    deadline stays at hour:00 across DST changes rather than drifting by
+    the hour a fixed timedelta would.
+    """
+    local = after.astimezone(tz)
+    day   = local.date() + datetime.timedelta(days=(weekday - local.weekday()) % 7)
     while True:
-        now   = get_current_pst_datetime()
-        today = now.strftime("%Y-%m-%d")
+        at = tz.normalize(tz.localize(datetime.datetime.combine(day, datetime.time(hour))))
+        if at > local:
+            return at
+        day += datetime.timedelta(days=7)
+
+class ArchiveScheduler:
+    """Runs every channel's weekly archive at Saturday 00:00 Pacific.
 
-        if now.weekday()==5 and now.strftime("%H:%M")=="00:00" and last_archive_date!=now.date():
-            archive_votes()
-            game_suggestions.clear(); user_votes.clear()
-            user_daily_counts.clear(); vote_history.clear()
-            write_vote_file()
-            last_archive_date = now.date()
+    Each channel's next deadline is computed once, kept in its state
+    directory, and slept towards on a timer, so the archive fires whether
+    or not anyone is chatting and nothing is checked per message. If the
+    deadline passed while the bot was down, start() archives straight
+    away. The sleep is capped at SCHEDULE_MAX_SLEEP so a suspended machine
+    or a wall-clock jump is noticed within that long. clock (an aware
+    datetime) and sleep can be swapped out, to step through DST weeks
+    without waiting.
+    """
+    def __init__(self, clock=get_current_pst_datetime, sleep=asyncio.sleep):
+        self.clock = clock
+        self.sleep = sleep
 
+    @staticmethod
+    def _load(ch):
         try:
-            resp = sock.recv(2048).decode("utf-8", errors="ignore")
-        except:
-            break
-        if resp.startswith("PING"):
-            sock.send("PONG :tmi.twitch.tv\r\n".encode()); continue
+            with open(ch.schedule_file, encoding="utf-8") as f:
+                return datetime.datetime.fromisoformat(json.load(f)["next_archive"]).astimezone(PST)
+        except (OSError, ValueError, KeyError):
+            return None
 
-        for line in resp.split("\r\n"):
-            if f"PRIVMSG {CHANNEL}" not in line: continue
-            user = line.split("!",1)[0][1:]; msg = line.split(":",2)[2].strip()
+    @staticmethod
+    def _save(ch):
+        os.makedirs(os.path.dirname(ch.schedule_file) or ".", exist_ok=True)
+        write_atomic(ch.schedule_file, json.dumps({"next_archive": ch.next_archive.isoformat()}))
 
-            # !archive
-            if msg.lower()=="!archive" and user.lower()==BOT_USERNAME.lower():
-                send_chat(sock, f"@{user} ⚠️ Archiving now... confirm with !confirmarchive")
-                continue
-            if msg.lower()=="!confirmarchive" and user.lower()==BOT_USERNAME.lower():
-                archive_votes()
-                game_suggestions.clear(); user_votes.clear()
-                user_daily_counts.clear(); vote_history.clear()
-                write_vote_file()
-                last_archive_date = now.date()
-                send_chat(sock, f"@{user} ✅ Archive complete, votes cleared.")
-                continue
+    def start(self, chans):
+        """Load each channel's deadline (first run: the coming one) and
+        catch up on any that passed while the bot was down."""
+        now = self.clock()
+        for ch in chans:
+            ch.next_archive = self._load(ch)
+            if ch.next_archive is None:
+                ch.next_archive = next_weekly(now)
+                self._save(ch)
+        self.run_due(chans, now)
 
-            # !archivedelete ...
-            if msg.lower().startswith("!archivedelete ") and user.lower()==BOT_USERNAME.lower():
-                arg = msg[len("!archivedelete "):].strip()
-                if arg.lower()=="all":
-                    pending_delete_all = True
-                    send_chat(sock, f"@{user} ⚠️ Confirm delete ALL archives with !confirmdeleteall")
-                else:
-                    pending_delete_fname = arg
-                    send_chat(sock, f"@{user} ⚠️ Confirm delete archive '{pending_delete_fname}' with !confirmdelete")
-                continue
+    def run_due(self, chans, now):
+        for ch in chans:
+            if ch.next_archive <= now:
+                # labelled with the missed deadline's week; if several
+                # passed, their votes are all on this one board anyway
+                run_archive(ch, ch.next_archive)
+                ch.next_archive = next_weekly(now)
+                self._save(ch)
 
-            if msg.lower()=="!confirmdelete" and user.lower()==BOT_USERNAME.lower() and pending_delete_fname:
-                fn = pending_delete_fname
-                path = os.path.join(ARCHIVE_DIR, fn)
-                if os.path.exists(path):
-                    os.remove(path)
-                    meta = []
-                    if os.path.exists(METADATA_FILE):
-                        with open(METADATA_FILE,"r",encoding="utf-8") as m:
-                            meta = json.load(m)
-                    meta = [e for e in meta if e.get("file")!=fn]
-                    with open(METADATA_FILE,"w",encoding="utf-8") as m:
-                        json.dump(meta,m,indent=2)
-                    generate_archive_index(); push_to_github()
-                    send_chat(sock, f"@{user} ✅ Archive '{fn}' deleted.")
-                else:
-                    send_chat(sock, f"@{user} ❌ Archive '{fn}' not found.")
-                pending_delete_fname = None
-                continue
+    async def run(self, chans):
+        chans = list(chans)
+        while True:
+            now = self.clock()
+            self.run_due(chans, now)
+            wait = (min(ch.next_archive for ch in chans) - now).total_seconds()
+            await self.sleep(min(max(wait, 0.0), SCHEDULE_MAX_SLEEP))
 
-            if msg.lower()=="!confirmdeleteall" and user.lower()==BOT_USERNAME.lower() and pending_delete_all:
-                for fn in os.listdir(ARCHIVE_DIR):
-                    if fn.endswith(".html") or fn.endswith(".json"):
-                        os.remove(os.path.join(ARCHIVE_DIR, fn))
-                with open(METADATA_FILE,"w",encoding="utf-8") as m:
-                    json.dump([],m,indent=2)
-                generate_archive_index(); push_to_github()
-                send_chat(sock, f"@{user} ✅ All archives deleted.")
-                pending_delete_all = False
-                continue
+# ====== LIVE SERVER ======
+CONTENT_TYPES = {".html": "text/html; charset=utf-8", ".json": "application/json",
+                 ".version": "application/json"}
+HTTP_STATUS   = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed"}
 
-            # !voteremove all
-            if msg.lower()=="!voteremove all" and user.lower()==BOT_USERNAME.lower():
-                pending_clear=True
-                send_chat(sock, f"@{user} ⚠️ Confirm delete ALL votes with !confirm")
-                continue
-            if msg.lower()=="!confirm" and user.lower()==BOT_USERNAME.lower() and pending_clear:
-                game_suggestions.clear(); user_votes.clear()
-                user_daily_counts.clear(); vote_history.clear()
-                write_vote_file()
-                pending_clear=False
-                send_chat(sock, f"@{user} ✅ All votes removed.")
-                continue
+class LiveServer:
+    """Optional built-in web server (HTTP_PORT) with live vote updates.
 
-            # !voteremove last
-            if msg.lower()=="!voteremove last" and user.lower()==BOT_USERNAME.lower():
-                if vote_history:
-                    k,u = vote_history.pop()
-                    game_suggestions[k]["votes"]-=1
-                    user_votes[u].pop(k,None)
-                    if game_suggestions[k]["votes"]<=0:
-                        del game_suggestions[k]
-                    write_vote_file(); send_chat(sock, f"@{user} 🗑️ Removed last vote '{k}'.")
-                else:
-                    send_chat(sock, f"@{user} 🤷 No vote history.")
-                continue
+    Each channel's page and vote files are served from memory, rendered at
+    most once per feed version, with ETags so revalidating browsers get a
+    304. <channel>/votes.events is a Server-Sent Events stream: each feed
+    delta is written to every subscriber within LIVE_INTERVAL of the vote.
+    A subscriber is only its socket in a set, with no task of its own, so
+    thousands of idle viewers cost little. Archives and commands.html are
+    read from disk. Git publishing carries on as before as the durable
+    copy; this is just the fast path.
+    """
+    def __init__(self, host=HTTP_HOST, port=HTTP_PORT):
+        self.host, self.port = host, port
+        self.requests = self.not_modified = self.pushed = 0
+        self._server   = None
+        self._routes   = {}                  # URL directory ("/", "/channels/x/") -> Channel
+        self._rendered = {}                  # "#chan" -> (feed version, {name: (body, etag)})
+        self._streams  = {}                  # "#chan" -> set of StreamWriter
+        self._dirty    = set()               # channels with votes not yet pushed
+        self._wakeup   = None
 
-            # !voteremove (own last vote)
-            if msg.lower() == "!voteremove":
-                for i in range(len(vote_history)-1, -1, -1):
-                    key, u = vote_history[i]
-                    if u == user:
-                        vote_history.pop(i)
-                        game_suggestions[key]["votes"] -= 1
-                        user_votes[user].pop(key, None)
-                        if game_suggestions[key]["votes"] <= 0:
-                            del game_suggestions[key]
-                        write_vote_file()
-                        send_chat(sock, f"@{user} 🗑️ Your last vote for '{key}' was removed.")
-                        break
-                else:
-                    send_chat(sock, f"@{user} 🤷 You have no recent vote to remove.")
-                continue
+    @property
+    def subscribers(self):
+        return sum(len(s) for s in self._streams.values())
 
-            # !voteremove <game>
-            if msg.lower().startswith("!voteremove ") and user.lower()==BOT_USERNAME.lower():
-                name = msg[len("!voteremove "):].strip()
-                key = (difflib.get_close_matches(name.lower(), game_suggestions.keys(), n=1, cutoff=0.7)
-                       or [name.lower()])[0]
-                if key in game_suggestions and game_suggestions[key]["votes"]>0:
-                    game_suggestions[key]["votes"]-=1
-                    for i in range(len(vote_history)-1,-1,-1):
-                        if vote_history[i][0]==key:
-                            vote_history.pop(i)
-                            break
-                    if game_suggestions[key]["votes"]<=0:
-                        del game_suggestions[key]
-                    write_vote_file(); send_chat(sock, f"@{user} 🗑️ Removed one vote from '{key}'.")
-                else:
-                    send_chat(sock, f"@{user} 🤷 No votes for '{name}'.")
+    async def start(self, chans):
+        for ch in chans:
+            url = "/" if ch.out_dir == "." else "/" + ch.out_dir.replace(os.sep, "/").strip("/") + "/"
+            self._routes[url] = ch
+            self._streams[ch.irc] = set()
+            ch.feed.on_delta = lambda delta, ch=ch: self.broadcast(ch, delta)
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        print(f"🌐 Serving vote pages on http://{self.host}:{self.port}/")
+
+    def notify(self, ch):
+        self._dirty.add(ch)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        """Turn fresh votes into feed deltas quickly; ping idle streams."""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), SSE_PING)
+            except asyncio.TimeoutError:
+                self._send_all(b": ping\n\n")
                 continue
+            await asyncio.sleep(LIVE_INTERVAL)   # let a burst of votes ride along
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, set()
+            for ch in dirty:
+                ch.feed.record(ch.leaderboard)   # broadcasts through feed.on_delta
 
-                
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writers in self._streams.values():
+                for w in writers:
+                    w.close()
+            await self._server.wait_closed()
 
-            # !vote <game>
-            if msg.lower().startswith("!vote "):
-                raw = msg[len("!vote "):].strip()
-                week = get_current_vote_week()
-                if user_daily_counts[user][today]>=5:
-                    send_chat(sock, f"@{user} ❌ You've reached 5 votes today.")
-                    continue
-                existing = difflib.get_close_matches(raw.lower(), game_suggestions.keys(), n=1, cutoff=0.7)
-                if existing:
-                    key = existing[0]
-                else:
-                    steam = find_steam_link(raw)
-                    if steam:
-                        name, link = steam
-                    else:
-                        name, link = raw, None
-                    key = name.lower()
-                    if key not in game_suggestions:
-                        game_suggestions[key] = {"name":name,"votes":0,"url":link,"user":user,"time":""}
-                if user_votes[user].get(key)==week:
-                    send_chat(sock, f"@{user} ❌ Already voted '{game_suggestions[key]['name']}' this week.")
-                    continue
-                game_suggestions[key]["votes"]+=1
-                now_ts = get_current_pst_datetime().strftime("%I:%M %p, %b %d")
-                game_suggestions[key]["user"]=user; game_suggestions[key]["time"]=now_ts
-                user_votes[user][key]=week; user_daily_counts[user][today]+=1
-                vote_history.append((key,user))
-                write_vote_file()
-                send_chat(sock, f"@{user} ✅ Vote for '{game_suggestions[key]['name']}' counted!")
+    # --- event streams ---
+    @staticmethod
+    def _event(delta):
+        return f"id: {delta['seq']}\ndata: {json.dumps(delta, separators=(',', ':'))}\n\n".encode()
+
+    def broadcast(self, ch, delta):
+        writers = self._streams.get(ch.irc)
+        if writers:
+            self.pushed += 1
+            self._send(writers, self._event(delta))
+
+    def _send_all(self, payload):
+        for writers in self._streams.values():
+            self._send(writers, payload)
+
+    @staticmethod
+    def _send(writers, payload):
+        for w in list(writers):
+            if w.is_closing() or w.transport.get_write_buffer_size() > SSE_MAX_BUFFER:
+                writers.discard(w)
+                w.close()
+            else:
+                w.write(payload)
+
+    def _subscribe(self, ch, writer, since):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nX-Accel-Buffering: no\r\n\r\nretry: 2000\n\n")
+        feed = ch.feed
+        if since is not None and since < feed.version:
+            if since + 1 >= feed.oldest:
+                for delta in feed.log():
+                    if delta["seq"] > since:
+                        writer.write(self._event(delta))
+            else:
+                # fell off the delta log: resend everything as one reset
+                writer.write(self._event({"seq": feed.version, "reset": True,
+                                          "set": [dict(e.as_dict(), order=e.order) for e in ch.leaderboard]}))
+        self._streams[ch.irc].add(writer)
+
+    # --- plain requests ---
+    def _channel_file(self, ch, name):
+        cached = self._rendered.get(ch.irc)
+        if cached is None or cached[0] != ch.feed.version:
+            files = {}
+            for n, text in render_vote_files(ch).items():
+                body = text.encode("utf-8")
+                files[n] = (body, '"%s"' % hashlib.sha1(body).hexdigest()[:16])
+            cached = self._rendered[ch.irc] = (ch.feed.version, files)
+        body, etag = cached[1][name]
+        return body, etag, CONTENT_TYPES[os.path.splitext(name)[1]]
+
+    @staticmethod
+    def _disk_file(path):
+        parts = path.strip("/").split("/")
+        if path.endswith("/") or parts == [""]:
+            parts.append("index.html")
+        parts = [p for p in parts if p]
+        ctype = CONTENT_TYPES.get(os.path.splitext(parts[-1])[1])
+        if ctype is None or parts[0].lower() == STATE_DIR or \
+           any(p.startswith(".") or "\\" in p or ":" in p for p in parts):
+            return None
+        fn = os.path.join(*parts)
+        try:
+            st = os.stat(fn)
+            with open(fn, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        return body, f'"{st.st_mtime_ns:x}-{st.st_size:x}"', ctype
+
+    def _lookup(self, path):
+        directory, _, name = path.rpartition("/")
+        ch = self._routes.get(directory + "/")
+        if ch is not None and name in ("", VOTE_FILE, VOTES_JSON, VOTES_DELTA, VOTES_VERSION):
+            return self._channel_file(ch, name or VOTE_FILE)
+        return self._disk_file(path)
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HTTP_IDLE)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = (lines[0].split(" ") + ["", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    key, _, value = line.partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                path, _, query = unquote(target).partition("?")
+                self.requests += 1
+                directory, _, name = path.rpartition("/")
+                ch = self._routes.get(directory + "/")
+                if ch is not None and name == VOTES_EVENTS and method == "GET":
+                    since = headers.get("last-event-id") or dict(
+                        q.partition("=")[::2] for q in query.split("&")).get("v")
+                    self._subscribe(ch, writer, int(since) if since and since.isdigit() else None)
+                    return                   # the socket now belongs to the stream set
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._respond(writer, method, path, headers, keep)
+                await writer.drain()
+                if not keep or method not in ("GET", "HEAD"):
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print("⚠️ HTTP error:", e)
+        writer.close()
+
+    def _respond(self, writer, method, path, headers, keep):
+        found = self._lookup(path) if method in ("GET", "HEAD") else None
+        if method not in ("GET", "HEAD"):
+            status, body, extra = 405, b"", "Allow: GET, HEAD\r\n"
+        elif found is None:
+            status, body, extra = 404, b"not found\n", "Content-Type: text/plain\r\n"
+        else:
+            body, etag, ctype = found
+            status = 304 if headers.get("if-none-match") == etag else 200
+            extra  = f"ETag: {etag}\r\nContent-Type: {ctype}\r\nCache-Control: no-cache\r\n"
+            if status == 304:
+                self.not_modified += 1
+                body = b""
+        writer.write((f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n{extra}"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n").encode())
+        if method == "GET":
+            writer.write(body)
+
+live = None                                  # LiveServer when HTTP_PORT is set
+
+# ====== CHANNELS ======
+class Channel:
+    """One joined Twitch channel and all of its state.
+
+    Votes, limits, history, the page and its feed, the write-ahead log,
+    the publish schedule and the archive schedule are per channel; only
+    the IRC connection, the chat outbox and the Steam cache are shared.
+    """
+    def __init__(self, name, out_dir=".", state_dir=STATE_DIR, publish_interval=PUBLISH_INTERVAL):
+        self.name          = name
+        self.irc           = "#" + name
+        self.out_dir       = out_dir
+        self.vote_file     = os.path.join(out_dir, VOTE_FILE)
+        self.votes_json    = os.path.join(out_dir, VOTES_JSON)
+        self.votes_version = os.path.join(out_dir, VOTES_VERSION)
+        self.votes_delta   = os.path.join(out_dir, VOTES_DELTA)
+        self.archive_dir   = os.path.join(out_dir, ARCHIVE_DIR)
+        self.archives      = ArchiveStore(self.archive_dir, os.path.join(out_dir, METADATA_FILE))
+        self.stats         = VoteStats(self.archives)
+        self.twitch_url    = TWITCH_URL + name
+        self.commands_href = os.path.relpath("commands.html", out_dir).replace(os.sep, "/")
+        self.leaderboard   = Leaderboard()
+        self.limiter       = VoteLimiter()
+        self.history       = VoteHistory()
+        self.matcher       = GameMatcher()
+        self.feed          = VoteFeed()
+        self.card_cache    = {}              # key -> ((votes,name,url,user,time), html)
+        self.page_shell    = None            # (before version, before games, after games)
+        self.vote_log      = VoteLog(self, state_dir)
+        self.publisher     = Publisher(self, publish_interval)
+        self.schedule_file = os.path.join(state_dir, "schedule.json")
+        self.next_archive  = None             # set by ArchiveScheduler.start()
+        self.pending_clear        = False    # for !voteremove all
+        self.pending_delete_fname = None     # for specific archive deletion
+        self.pending_delete_all   = False    # for delete all archives
+
+    def open(self):
+        """Create the output directory and recover state; returns events replayed."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        replayed = self.vote_log.open()
+        self.feed.load(self.votes_version)
+        self.publisher.mark_dirty()
+        return replayed
+
+channels = {}                                # "#name" -> Channel
+
+def setup_channels(names=CHANNEL_NAMES):
+    """One channel keeps the classic layout at the repo root; several get
+    channels/<name>/ for their pages and state/<name>/ for their logs."""
+    channels.clear()
+    for name in names:
+        if len(names) == 1:
+            ch = Channel(name)
+        else:
+            ch = Channel(name, os.path.join(CHANNELS_DIR, name), os.path.join(STATE_DIR, name))
+        channels[ch.irc] = ch
+    return channels
+
+setup_channels()
+
+# ====== IRC ENGINE ======
+inbox          = None                        # asyncio.Queue of raw IRC lines
+pending_tasks  = set()                       # background vote lookups in flight
+last_recv_time = 0.0
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    pending_tasks.add(task)
+    task.add_done_callback(pending_tasks.discard)
+    return task
+
+TAG_ESCAPES = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+def unescape_tag(value):
+    if "\\" not in value:
+        return value
+    out, chars = [], iter(value)
+    for c in chars:
+        if c == "\\":
+            c = next(chars, "")
+            out.append(TAG_ESCAPES.get(c, c))
+        else:
+            out.append(c)
+    return "".join(out)
+
+class IrcMessage:
+    """One parsed IRC line: @tags :prefix COMMAND params… :trailing.
+
+    The trailing parameter, if any, is the last entry of params and may
+    contain spaces and colons. Tags are kept raw and only split into a dict
+    when asked for, since most lines are never looked at that closely.
+    """
+    __slots__ = ("raw_tags", "prefix", "command", "params", "_tags")
+
+    def __init__(self, raw_tags, prefix, command, params):
+        self.raw_tags, self.prefix, self.command, self.params = raw_tags, prefix, command, params
+        self._tags = None
+
+    @property
+    def nick(self):
+        return self.prefix.split("!", 1)[0]
+
+    @property
+    def tags(self):
+        if self._tags is None:
+            self._tags = {}
+            for item in self.raw_tags.split(";") if self.raw_tags else ():
+                key, _, value = item.partition("=")
+                self._tags[key] = unescape_tag(value)
+        return self._tags
+
+def parse_irc(line):
+    """IrcMessage for a raw line (no CRLF), or None if it has no command."""
+    raw_tags = prefix = ""
+    if line[:1] == "@":
+        raw_tags, _, line = line[1:].partition(" ")
+        line = line.lstrip(" ")
+    if line[:1] == ":":
+        prefix, _, line = line[1:].partition(" ")
+    head, colon, trailing = line.partition(" :")
+    params = head.split()
+    if not params:
+        return None
+    command = params.pop(0).upper()
+    if colon:
+        params.append(trailing)
+    return IrcMessage(raw_tags, prefix, command, params)
+
+async def read_loop(reader, writer):
+    global last_recv_time
+    while True:
+        raw = await reader.readline()
+        if not raw:
+            raise ConnectionError("server closed the connection")
+        last_recv_time = time.monotonic()
+        line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+        if line.startswith("PING"):
+            writer.write(f"PONG {line[5:]}\r\n".encode())
+            continue
+        inbox.put_nowait(line)
+
+async def dispatch_loop():
+    while True:
+        line = await inbox.get()
+        metrics.inc("lines_total")
+        try:
+            handle_line(line)
+        except Exception as e:
+            print("⚠️ Error handling line:", e)
+
+async def keepalive_loop(writer):
+    while True:
+        await asyncio.sleep(PING_INTERVAL)
+        if time.monotonic() - last_recv_time > 2 * PING_INTERVAL:
+            raise ConnectionError("no traffic from server, connection looks dead")
+        writer.write(b"PING :tmi.twitch.tv\r\n")
+        await writer.drain()
+
+async def join_channels(writer):
+    """JOIN every channel, in batches that stay inside Twitch's join limit."""
+    names = list(channels)
+    for i in range(0, len(names), JOIN_LIMIT):
+        if i:
+            await asyncio.sleep(JOIN_WINDOW)
+        batch = names[i:i+JOIN_LIMIT]
+        writer.write(f"JOIN {','.join(batch)}\r\n".encode())
+        await writer.drain()
+        print(f"✅ Connected to {', '.join(batch)}")
+
+# ====== COMMANDS ======
+def reset_votes(ch):
+    ch.leaderboard.clear(); ch.limiter.clear(); ch.history.clear()
+    ch.matcher.clear()
+
+def run_archive(ch, now=None):
+    write_vote_file(ch)
+    week_id = archive_votes(ch, now)
+    record(ch, {"op": "archive", "week": week_id})
+    ch.vote_log.rotate(week_id)
+    ch.publisher.flush()
+
+def remove_vote(ch, key):
+    """Take one vote off key, dropping the game once it has none left."""
+    if ch.leaderboard.decrement(key).votes <= 0:
+        ch.leaderboard.remove(key); ch.matcher.remove(key)
+
+def rename_game(ch, key, new, name, url):
+    """File key (a spelling from chat) under new (the Steam title), with its
+    store link. If another spelling already got there, the two merge: the
+    ballots and the chatters' weekly limits move along, and a chatter who
+    voted under both keeps one vote."""
+    info = ch.leaderboard.get(key)
+    if info is None:
+        return
+    if new != key:
+        users = ch.history.rekey(key, new)
+        ch.limiter.rekey(users, key, new)
+        created = new not in ch.leaderboard
+        dst = ch.leaderboard.add(new, name, url, info.user)
+        if created:
+            dst.time = info.time
+            ch.matcher.add(new)
+        for _ in range(info.votes):
+            ch.leaderboard.decrement(key)
+            ch.leaderboard.increment(new)
+        ch.leaderboard.remove(key); ch.matcher.remove(key)
+        for user in set(users):
+            while ch.history.count_by(user, new) > 1:
+                ch.history.remove(new, user)
+                remove_vote(ch, new)
+        info = dst
+    if not info.url:
+        info.name, info.url = name, url
+        ch.leaderboard.touch(info.key)
+
+def apply_event(ch, ev):
+    """Apply one logged mutation to a channel's vote state (live and on replay)."""
+    op = ev["op"]
+    if op == "vote":
+        key, user = ev["key"], ev["user"]
+        if ch.leaderboard.get(key) is None:
+            ch.leaderboard.add(key, ev["name"], ev["url"], user)
+            ch.matcher.add(key)
+        info = ch.leaderboard.increment(key)
+        info.user, info.time = user, ev["time"]
+        ch.limiter.count(user, key, ev["day"], ev["week"])
+        ch.history.add(key, user)
+        return info
+    if op == "unvote":
+        key, user = ev["key"], ev["user"]
+        ch.history.remove(key, user)
+        remove_vote(ch, key)
+        if ev["forget"]:
+            ch.limiter.forget(user, key)
+    elif op == "url":                        # logs from before "rename"
+        info = ch.leaderboard.get(ev["key"])
+        if info is not None and not info.url:
+            info.name, info.url = ev["name"], ev["url"]
+            ch.leaderboard.touch(info.key)
+    elif op == "rename":
+        rename_game(ch, ev["key"], ev["to"], ev["name"], ev["url"])
+    elif op in ("clear", "archive"):
+        reset_votes(ch)
+
+def record(ch, ev):
+    """Log a mutation, then apply it."""
+    ch.vote_log.append(ev)
+    return apply_event(ch, ev)
+
+def handle_line(line):
+    """Route a raw IRC line: channel by dict lookup, then the command table.
+
+    Chat that can't be a command (no " :!" anywhere) is dropped before it is
+    even parsed; so is anything that is not a PRIVMSG to a joined channel.
+    """
+    if " :!" not in line:
+        return
+    msg = parse_irc(line)
+    if msg is None or msg.command != "PRIVMSG" or len(msg.params) < 2:
+        return
+    ch = channels.get(msg.params[0])
+    if ch is None:
+        return
+    text = msg.params[1]
+    if text[:1] != "!":
+        return
+    name, _, args = text.rstrip().partition(" ")
+    args = args.strip()
+    entry = COMMANDS.get((name.lower(), bool(args)))
+    if entry is None:
+        return
+    handler, level = entry
+    user = msg.nick
+    if level == OWNER and user.lower() != (BOT_USERNAME or "").lower():
+        return
+    t = time.perf_counter()
+    handler(ch, user, args, get_current_pst_datetime())
+    metrics.observe("command", time.perf_counter() - t)
+    metrics.inc("commands_total")
+
+def cmd_archive(ch, user, args, now):
+    send_chat(ch, f"@{user} ⚠️ Archiving now... confirm with !confirmarchive")
+
+def cmd_confirm_archive(ch, user, args, now):
+    run_archive(ch)
+    send_chat(ch, f"@{user} ✅ Archive complete, votes cleared.")
+
+def cmd_archive_delete(ch, user, args, now):
+    if args.lower()=="all":
+        ch.pending_delete_all = True
+        send_chat(ch, f"@{user} ⚠️ Confirm delete ALL archives with !confirmdeleteall")
+    else:
+        ch.pending_delete_fname = args
+        send_chat(ch, f"@{user} ⚠️ Confirm delete archive '{ch.pending_delete_fname}' with !confirmdelete")
+
+def cmd_confirm_delete(ch, user, args, now):
+    if not ch.pending_delete_fname:
+        return
+    fn = ch.pending_delete_fname
+    week_id = ch.archives.find(fn)
+    if week_id is not None:
+        # pages from this week on shift by one; rewrite them before it is gone
+        after = ch.archives.weeks()[ch.archives.position(week_id) + 1:]
+        ch.archives.remove(week_id); ch.stats.remove_week(week_id)
+        generate_archive_index(ch, after[0] if after else week_id); ch.publisher.flush()
+        send_chat(ch, f"@{user} ✅ Archive '{fn}' deleted.")
+    else:
+        send_chat(ch, f"@{user} ❌ Archive '{fn}' not found.")
+    ch.pending_delete_fname = None
+
+def cmd_confirm_delete_all(ch, user, args, now):
+    if not ch.pending_delete_all:
+        return
+    if os.path.isdir(ch.archive_dir):
+        for fn in os.listdir(ch.archive_dir):
+            if fn.endswith(".html") or fn.endswith(".json"):
+                remove_file(os.path.join(ch.archive_dir, fn))
+    ch.archives.clear(); ch.stats.clear()
+    generate_archive_index(ch); ch.publisher.flush()
+    send_chat(ch, f"@{user} ✅ All archives deleted.")
+    ch.pending_delete_all = False
+
+def cmd_confirm(ch, user, args, now):
+    if not ch.pending_clear:
+        return
+    record(ch, {"op": "clear"})
+    ch.publisher.mark_dirty()
+    ch.pending_clear=False
+    send_chat(ch, f"@{user} ✅ All votes removed.")
+
+def cmd_voteremove_own(ch, user, args, now):
+    last = ch.history.last_by(user)
+    if last:
+        record(ch, {"op": "unvote", "key": last.key, "user": user, "forget": True})
+        ch.publisher.mark_dirty()
+        send_chat(ch, f"@{user} 🗑️ Your last vote for '{last.key}' was removed.")
+    else:
+        send_chat(ch, f"@{user} 🤷 You have no recent vote to remove.")
+
+def cmd_voteremove(ch, user, args, now):
+    """!voteremove all | last | <game> (owner only)."""
+    if args.lower()=="all":
+        ch.pending_clear=True
+        send_chat(ch, f"@{user} ⚠️ Confirm delete ALL votes with !confirm")
+        return
+    if args.lower()=="last":
+        last = ch.history.last()
+        if last:
+            record(ch, {"op": "unvote", "key": last.key, "user": last.user, "forget": True})
+            ch.publisher.mark_dirty(); send_chat(ch, f"@{user} 🗑️ Removed last vote '{last.key}'.")
+        else:
+            send_chat(ch, f"@{user} 🤷 No vote history.")
+        return
+    key = ch.matcher.match(args) or args.lower()
+    if key in ch.leaderboard and ch.leaderboard.get(key).votes>0:
+        last = ch.history.last_for(key)
+        record(ch, {"op": "unvote", "key": key, "user": last and last.user, "forget": True})
+        ch.publisher.mark_dirty(); send_chat(ch, f"@{user} 🗑️ Removed one vote from '{key}'.")
+    else:
+        send_chat(ch, f"@{user} 🤷 No votes for '{args}'.")
+
+def cmd_vote(ch, user, raw, now):
+    today = now.strftime("%Y-%m-%d")
+    if ch.limiter.votes_today(user, today)>=DAILY_VOTE_LIMIT:
+        metrics.inc('rejected_total{reason="daily_limit"}')
+        send_chat(ch, f"@{user} ❌ You've reached {DAILY_VOTE_LIMIT} votes today.")
+        return
+    t = time.perf_counter()
+    key = ch.matcher.match(raw)
+    metrics.observe("match", time.perf_counter() - t)
+    name = link = None
+    if key is not None:
+        metrics.inc('matched_total{how="exact"}' if key == raw.lower() else 'matched_total{how="fuzzy"}')
+    else:
+        metrics.inc('matched_total{how="new"}')
+        cached = steam_cache.get(raw)
+        metrics.inc('steam_cache_total{result="miss"}' if cached is None else 'steam_cache_total{result="hit"}')
+        if cached and cached[0]:
+            name, link = cached[1]
+        else:
+            name, link = raw, None
+        key = name.lower()
+        if cached is None:
+            # count now, fill in the store link once Steam answers
+            spawn(fill_store_link(ch, key, raw))
+    count_vote(ch, user, key, today, name, link)
+
+def cmd_top(ch, user, args, now):
+    top = ch.stats.top()
+    if not top:
+        send_chat(ch, f"@{user} 📭 No archived weeks yet.")
+        return
+    send_chat(ch, f"@{user} 🏆 All-time: " + " | ".join(
+        f"{i}. {name} ({votes} votes, {weeks} wk)" for i, (name, votes, weeks) in enumerate(top, 1)))
+
+def cmd_history(ch, user, args, now):
+    h = ch.stats.history(args)
+    if h is None:
+        send_chat(ch, f"@{user} 🤷 '{args}' isn't in the archives.")
+        return
+    send_chat(ch, f"@{user} 📜 {h['name']}: {h['votes']} votes over {h['weeks']} week(s), "
+                  f"best {h['best_votes']} in {h['best_week']}, first seen {h['first_week']}, "
+                  f"last seen {h['last_week']}.")
+
+def cmd_stats(ch, user, args, now):
+    s = ch.stats.summary()
+    if not s["weeks"]:
+        send_chat(ch, f"@{user} 📭 No archived weeks yet.")
+        return
+    msg = f"@{user} 📊 {s['weeks']} weeks archived, {s['votes']} votes for {s['games']} games"
+    msg += f" from {s['voters']} chatters." if s["voters"] else "."   # HTML-era weeks kept no voters
+    voters = ch.stats.top_voters()
+    if voters:
+        msg += f" Top voters (last {s['recent_weeks']} wk): " + ", ".join(f"{u} {n}" for u, n in voters)
+    send_chat(ch, msg)
+
+EVERYONE, OWNER = 0, 1                       # who may run a command
+
+# (command, takes arguments) -> (handler, level)
+COMMANDS = {
+    ("!archive",          False): (cmd_archive,             OWNER),
+    ("!confirmarchive",   False): (cmd_confirm_archive,     OWNER),
+    ("!archivedelete",    True):  (cmd_archive_delete,      OWNER),
+    ("!confirmdelete",    False): (cmd_confirm_delete,      OWNER),
+    ("!confirmdeleteall", False): (cmd_confirm_delete_all,  OWNER),
+    ("!confirm",          False): (cmd_confirm,             OWNER),
+    ("!voteremove",       False): (cmd_voteremove_own,      EVERYONE),
+    ("!voteremove",       True):  (cmd_voteremove,          OWNER),
+    ("!vote",             True):  (cmd_vote,                EVERYONE),
+    ("!top",              False): (cmd_top,                 EVERYONE),
+    ("!history",          True):  (cmd_history,             EVERYONE),
+    ("!stats",            False): (cmd_stats,               EVERYONE),
+}
+
+async def fill_store_link(ch, key, raw):
+    """Once Steam answers, file the game under its store title, the key a
+    cached lookup would have given it, so other spellings end up on one card."""
+    steam = await steam_cache.resolve(raw)
+    info  = ch.leaderboard.get(key)
+    if steam and info is not None and not info.url:
+        record(ch, {"op": "rename", "key": key, "to": steam[0].lower(), "name": steam[0], "url": steam[1]})
+        ch.publisher.mark_dirty()
+
+def count_vote(ch, user, key, today, name=None, link=None):
+    week = get_current_vote_week()
+    if ch.limiter.has_voted(user, key, week):
+        metrics.inc('rejected_total{reason="already_voted"}')
+        info = ch.leaderboard.get(key)
+        send_chat(ch, f"@{user} ❌ Already voted '{info.name if info else name}' this week.")
+        return
+    now_ts = get_current_pst_datetime().strftime("%I:%M %p, %b %d")
+    info = record(ch, {"op": "vote", "key": key, "name": name, "url": link, "user": user,
+                       "time": now_ts, "week": week, "day": today})
+    ch.publisher.mark_dirty()
+    metrics.inc("votes_total")
+    outbox.confirm(ch.irc, user, info.name)
+
+async def warm_up():
+    """Startup work that can wait until votes are being counted: the
+    imports a first Steam lookup needs, the cross-week stats, and the emote
+    list, which is then kept fresh."""
+    await asyncio.to_thread(lambda: [importlib.import_module(m) for m in ("requests", "bs4")])
+    for ch in channels.values():
+        ch.archives.weeks()                  # the index is read on the loop, the weeks off it
+        await asyncio.to_thread(ch.stats.load)
+    while True:
+        if await asyncio.to_thread(refresh_meme_urls):
+            for ch in channels.values():
+                ch.page_shell = None         # recompiled with the new emotes
+                ch.publisher.mark_dirty()
+        await asyncio.sleep(MEME_REFRESH)
+
+def register_gauges():
+    """Queue depths and the counters other objects keep, for metrics."""
+    metrics.gauge("inbox_depth",             lambda: inbox.qsize())
+    metrics.gauge("outbox_depth",            lambda: outbox.depth)
+    metrics.gauge("steam_lookups_in_flight", lambda: len(steam_cache._inflight))
+    metrics.gauge("background_tasks",        lambda: len(pending_tasks))
+    metrics.gauge("sse_subscribers",         lambda: live.subscribers if live is not None else 0)
+    metrics.gauge("outbox_sent_total",       lambda: outbox.sent,    "counter")
+    metrics.gauge("outbox_merged_total",     lambda: outbox.merged,  "counter")
+    metrics.gauge("outbox_dropped_total",    lambda: outbox.dropped, "counter")
+    metrics.gauge("steam_errors_total",      lambda: steam_cache.errors, "counter")
+    metrics.gauge("publishes_total",
+                  lambda: sum(ch.publisher.publish_count for ch in channels.values()), "counter")
+
+async def main():
+    global inbox, last_recv_time, live
+    register_gauges()
+    for ch in channels.values():
+        replayed = ch.open()
+        if replayed or len(ch.leaderboard):
+            print(f"♻️ {ch.irc}: restored {len(ch.leaderboard)} games, "
+                  f"{ch.leaderboard.total_votes} votes ({replayed} logged events)")
+    scheduler = ArchiveScheduler()
+    scheduler.start(channels.values())
+    try:
+        reader, writer = await asyncio.open_connection(IRC_HOST, IRC_PORT, limit=READ_LIMIT)
+    except Exception as e:
+        print("Connection error:", e)
+        for ch in channels.values():
+            ch.vote_log.close()
+        return
+    writer.write(f"PASS {OAUTH_TOKEN}\r\n".encode())
+    writer.write(f"NICK {BOT_USERNAME}\r\n".encode())
+    await writer.drain()
+
+    inbox          = asyncio.Queue()
+    last_recv_time = time.monotonic()
+    tasks = [
+        asyncio.create_task(read_loop(reader, writer), name="read"),
+        asyncio.create_task(dispatch_loop(),           name="dispatch"),
+        asyncio.create_task(outbox.run(writer),        name="send"),
+        asyncio.create_task(keepalive_loop(writer),    name="keepalive"),
+        asyncio.create_task(scheduler.run(channels.values()), name="archive"),
+    ]
+    for ch in channels.values():
+        tasks.append(asyncio.create_task(ch.publisher.run(), name=f"publish {ch.irc}"))
+        tasks.append(asyncio.create_task(ch.vote_log.run(),  name=f"wal {ch.irc}"))
+    if HTTP_PORT:
+        live = LiveServer()
+        await live.start(channels.values())
+        tasks.append(asyncio.create_task(live.run(), name="live"))
+    metrics_server = await serve_metrics() if METRICS_PORT else None
+    if METRICS_LOG_INTERVAL:
+        tasks.append(asyncio.create_task(metrics_log_loop(METRICS_LOG_INTERVAL), name="metrics"))
+    if PROFILE_FILE:
+        tasks.append(asyncio.create_task(profile_loop(PROFILE_FILE), name="profile"))
+    spawn(join_channels(writer))
+    spawn(warm_up())
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception():
+                print("🔌 Disconnected:", task.exception())
+    finally:
+        for task in tasks + list(pending_tasks):
+            task.cancel()
+        await asyncio.gather(*tasks, *pending_tasks, return_exceptions=True)
+        if live is not None:
+            await live.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+        for ch in channels.values():
+            await ch.publisher.stop()
+            ch.vote_log.close()
+        steam_cache.close()
+        writer.close()
 
 def update_website():
-    write_vote_file()
+    for ch in channels.values():
+        write_vote_file(ch)
 
 def run_bot():
     try:
-        main()
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print("💥 Unhandled error:", e)
         input("Press Enter to exit…")
 
 if __name__ == "__main__":
-    run_bot()
\ No newline at end of file
+    run_bot()